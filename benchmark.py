@@ -0,0 +1,205 @@
+"""
+Benchmarks of the hot paths of the solver and of end-to-end strategies.
+Results are written as JSON, so that runs on different commits can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+import engine
+import helper
+import memo
+import simulator
+import solver
+from candidates import CandidateSet
+
+__author__ = "Z Feng"
+
+
+def measure(func, repeat: int) -> list:
+    """
+    :param func: function without arguments
+    :param repeat: number of calls
+    :return: wall time of every call in seconds
+    """
+    times = []
+    for i in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t_start)
+    return times
+
+
+def summarise(times: list, unit: str = 's', per_call: int = 1) -> dict:
+    """
+    Summary of wall times. If per_call is more than 1, the throughput of the operations in one call is reported too.
+    """
+    result = {'median': float(np.median(times)), 'min': float(np.min(times)), 'repeat': len(times), 'unit': unit}
+    if per_call > 1:
+        result['throughput'] = per_call / result['median']
+    return result
+
+
+def bench_compare(rng: random.Random, pairs: int = 20000) -> dict:
+    lut = engine.get_engine().similarity_lut
+    words = [(rng.choice(lut.legal_guesses), rng.choice(lut.potential_answers)) for i in range(pairs)]
+    return {
+        'compare': summarise(measure(lambda: [helper.compare(g, a) for g, a in words], 5), per_call=pairs),
+        'compare_lut': summarise(measure(lambda: [helper.compare(g, a, lut=lut) for g, a in words], 5),
+                                 per_call=pairs),
+    }
+
+
+def bench_pattern_table(rows: int = 1000) -> dict:
+    lut = engine.get_engine().similarity_lut
+    guesses = lut.legal_guesses[:rows]
+    times = measure(lambda: helper.gen_pattern_matrix(guesses, lut.potential_answers), 3)
+    return {'pattern_table': summarise(times, per_call=rows)}
+
+
+def bench_entropy(rng: random.Random, sizes: tuple = (2315, 200, 20)) -> dict:
+    lut = engine.get_engine().similarity_lut
+    results = {}
+    for size in sizes:
+        size = min(size, len(lut.potential_answers))
+        candidates = CandidateSet.from_words(lut, rng.sample(lut.potential_answers, size))
+        times = measure(lambda: solver.compute_entropy(lut.legal_guesses, candidates, do_print=False), 5)
+        results[f'compute_entropy_{size}'] = summarise(times)
+    return results
+
+
+def bench_refine(rng: random.Random, refines: int = 1000) -> dict:
+    lut = engine.get_engine().similarity_lut
+    full = CandidateSet.full(lut)
+    words = lut.potential_answers
+    cases = []
+    for i in range(refines):
+        guess = rng.choice(lut.legal_guesses)
+        cases.append((guess, helper.compare(guess, rng.choice(words), lut=lut)))
+    return {
+        'refine_candidate_set': summarise(measure(
+            lambda: [solver.refine_potential_answers(g, full, s) for g, s in cases], 3), per_call=refines),
+        'refine_list': summarise(measure(
+            lambda: [solver.refine_potential_answers(g, words, s) for g, s in cases[:refines // 10]], 3),
+            per_call=refines // 10),
+    }
+
+
+def play_games(answers: list, strategy: str, cache) -> tuple:
+    """
+    Play games against auto_solver.
+    :param answers: answers of the games
+    :param strategy: strategy of the automatic solver
+    :param cache: decision cache of auto_solver, None to disable it
+    :return: wall time of every turn and of all games in seconds
+    """
+    turn_times = []
+    t_start = time.perf_counter()
+    for answer in answers:
+        gen = solver.auto_solver(strategy=strategy, cache=cache)
+        t_turn = time.perf_counter()
+        guess = next(gen)
+        turn_times.append(time.perf_counter() - t_turn)
+        for attempt in range(simulator.max_auto_attempts - 1):
+            if guess == answer:
+                break
+            similarity = helper.compare(guess, answer)
+            t_turn = time.perf_counter()
+            next(gen)
+            guess = gen.send(similarity)
+            turn_times.append(time.perf_counter() - t_turn)
+    return turn_times, time.perf_counter() - t_start
+
+
+def bench_games(rng: random.Random, strategy: str, games: int) -> dict:
+    """
+    Per-turn latency of auto_solver and throughput of full games, with the decision cache disabled so that every
+    decision is computed. The throughput of the same games replayed from a filled decision cache is reported
+    separately.
+    """
+    answers = rng.sample(engine.get_engine().similarity_lut.potential_answers, games)
+    turn_times, wall_time = play_games(answers, strategy, None)
+    cache = memo.DecisionCache()
+    play_games(answers, strategy, cache)
+    cached_turn_times, cached_wall_time = play_games(answers, strategy, cache)
+    return {
+        'auto_solver_turn': summarise(turn_times),
+        'simulation': {'median': wall_time / games, 'min': wall_time / games, 'repeat': games, 'unit': 's',
+                       'throughput': games / wall_time},
+        'simulation_cached': {'median': cached_wall_time / games, 'min': cached_wall_time / games, 'repeat': games,
+                              'unit': 's', 'throughput': games / cached_wall_time},
+    }
+
+
+def run(mode: str = 'warm', strategy: str = 'score 2', games: int = 50, seed: int = 0) -> dict:
+    """
+    Run every benchmark.
+    :param mode: 'warm' uses the cached artifacts, 'cold' builds the artifacts in an empty cache directory
+    :param strategy: strategy of the automatic solver
+    :param games: number of simulated games
+    :param seed: seed of the random samples
+    :return: results with metadata
+    """
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t_start = time.perf_counter()
+        engine.reset_engine(cache_dir if mode == 'cold' else None)
+        results['engine_startup'] = summarise([time.perf_counter() - t_start])
+        results.update(bench_compare(rng))
+        results.update(bench_pattern_table())
+        results.update(bench_entropy(rng))
+        results.update(bench_refine(rng))
+        results.update(bench_games(rng, strategy, games))
+    try:
+        # the commit of the benchmarked code, wherever the benchmark is run from
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mode': mode, 'strategy': strategy,
+            'seed': seed, 'python': platform.python_version(), 'numpy': np.__version__, 'results': results}
+
+
+def print_results(report: dict, baseline: dict = None) -> None:
+    """
+    Print the results of a run, compared to those of a baseline run if given.
+    """
+    print(f'commit {report["commit"]}, {report["mode"]} mode' +
+          ('' if baseline is None else f', baseline commit {baseline["commit"]}'))
+    print(f'{"benchmark":<24}{"median":>12}{"throughput":>14}' + ('' if baseline is None else f'{"speedup":>10}'))
+    for name, result in report['results'].items():
+        throughput = f'{result["throughput"]:>12.1f}/s' if 'throughput' in result else ' ' * 14
+        line = f'{name:<24}{result["median"] * 1e3:>10.3f}ms{throughput}'
+        if baseline is not None and name in baseline['results']:
+            line += f'{baseline["results"][name]["median"] / result["median"]:>9.2f}x'
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=('warm', 'cold'), default='warm', help="cache mode")
+    parser.add_argument('--strategy', default='score 2', help="strategy of the automatic solver")
+    parser.add_argument('--games', type=int, default=50, help="number of simulated games")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random samples")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of a baseline run to compare to")
+    args = parser.parse_args()
+    benchmark_report = run(args.mode, args.strategy, args.games, args.seed)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(benchmark_report, f, indent=2)
+    baseline_report = None
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            baseline_report = json.load(f)
+    print_results(benchmark_report, baseline_report)
+
+# EOF
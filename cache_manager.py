@@ -0,0 +1,130 @@
+"""
+Cache manager for the artifacts of the solvers: the pattern matrix, initial entropies and initial probabilities.
+Artifacts are stored under a key derived from the content of the dictionaries and the cache version, so editing a word
+list never reuses stale artifacts. Files are written atomically and builds are locked against parallel processes.
+"""
+
+import contextlib
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+import helper
+import table_builder
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+__author__ = "Z Feng"
+
+cache_version = '1'  # bump when the format or the computation of any artifact changes
+default_cache_dir = os.environ.get('WORDLE_CACHE_DIR', '.wordle_cache')
+
+
+class CacheManager:
+    """
+    Directory of cached artifacts for one pair of dictionaries.
+    """
+
+    def __init__(self, cache_dir: str = None, legal_guesses: list = None, potential_answers: list = None):
+        """
+        :param cache_dir: root directory of the cache. Default $WORDLE_CACHE_DIR or .wordle_cache
+        :param legal_guesses: list of legal guesses
+        :param potential_answers: list of potential answers
+        """
+        if legal_guesses is None:
+            legal_guesses = helper.get_guess_dictionary()
+        if potential_answers is None:
+            potential_answers = helper.get_answer_dictionary()
+        self.legal_guesses = legal_guesses
+        self.potential_answers = potential_answers
+        digest = hashlib.sha256(helper.dictionary_hash(legal_guesses, potential_answers).encode())
+        digest.update(cache_version.encode())
+        self.key = digest.hexdigest()[:16]
+        self.directory = os.path.join(cache_dir or default_cache_dir, self.key)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """
+        :param name: name of the artifact
+        :return: path of the .npy file of the artifact
+        """
+        return os.path.join(self.directory, name + '.npy')
+
+    @contextlib.contextmanager
+    def lock(self, name: str):
+        """
+        Context manager holding an exclusive lock on an artifact across processes.
+        :param name: name of the artifact
+        """
+        with open(os.path.join(self.directory, name + '.lock'), 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def save(self, name: str, array: np.ndarray) -> None:
+        """
+        Save an artifact atomically: readers see either the old file or the complete new one.
+        :param name: name of the artifact
+        :param array: content of the artifact
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path(name))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load_or_build(self, name: str, build, mmap_mode: str = None) -> np.ndarray:
+        """
+        Load an artifact, building and saving it first if it is not cached. Only one process builds a missing artifact,
+        the others wait for it and load the result.
+        :param name: name of the artifact
+        :param build: function without arguments returning the content of the artifact
+        :param mmap_mode: mmap_mode of np.load, e.g. 'r' to share a read-only memory map between processes
+        :return: content of the artifact
+        """
+        path = self.path(name)
+        if not os.path.exists(path):
+            with self.lock(name):
+                if not os.path.exists(path):
+                    print(f'Building {name}...')
+                    self.save(name, build())
+        return np.load(path, mmap_mode=mmap_mode)
+
+    def load_pattern_lut(self, workers: int = None, rows: int = None) -> helper.PatternLUT:
+        """
+        Load the pattern matrix as a read-only memory map, so that processes share a single copy through the page cache.
+        A missing matrix is built in shards by the table builder, resuming the shards of an interrupted build.
+        :param workers: number of worker processes of a build. Default see table_builder.default_workers.
+        :param rows: guesses of every shard of a build. Default see table_builder.
+        :return: pattern LUT
+        """
+        path = self.path('pattern_matrix')
+        if not os.path.exists(path):
+            with self.lock('pattern_matrix'):
+                if not os.path.exists(path):
+                    table_builder.build_pattern_table(self.legal_guesses, self.potential_answers, path,
+                                                      workers or table_builder.default_workers(), rows)
+        matrix = np.load(path, mmap_mode='r')
+        return helper.PatternLUT(matrix, self.legal_guesses, self.potential_answers)
+
+# EOF
@@ -0,0 +1,90 @@
+"""
+Candidate sets of potential answers backed by boolean masks over answer IDs.
+"""
+
+import numpy as np
+
+import helper
+
+__author__ = "Z Feng"
+
+
+class CandidateSet:
+    """
+    Set of potential answers represented by a boolean mask over the answer IDs of a pattern LUT. Filtering by a guess
+    and a similarity is a single vectorised compare against a row of the pattern matrix, and no strings are compared.
+    """
+
+    def __init__(self, lut: helper.PatternLUT, mask: np.ndarray):
+        """
+        :param lut: pattern LUT whose answer IDs index the mask
+        :param mask: boolean mask of shape (len(lut.potential_answers),)
+        """
+        self.lut = lut
+        self.mask = mask
+        self._ids = None
+
+    @classmethod
+    def full(cls, lut: helper.PatternLUT):
+        """
+        :return: set of every potential answer of the LUT
+        """
+        return cls(lut, np.ones(len(lut.potential_answers), dtype=bool))
+
+    @classmethod
+    def from_words(cls, lut: helper.PatternLUT, words: list):
+        """
+        :return: set of the given words, which must all be potential answers of the LUT
+        """
+        mask = np.zeros(len(lut.potential_answers), dtype=bool)
+        mask[[lut.answer_ids[word] for word in words]] = True
+        return cls(lut, mask)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        Sorted answer IDs of the candidates.
+        """
+        if self._ids is None:
+            self._ids = np.flatnonzero(self.mask)
+        return self._ids
+
+    def refine(self, guess: str, similarity: int):
+        """
+        Refine the candidates from the result of a particular guess.
+        :param guess: guessed word, which must be a legal guess of the LUT
+        :param similarity: similarity between guess and true answer
+        :return: refined candidate set
+        """
+        return self.refine_id(self.lut.guess_ids[guess], similarity)
+
+    def refine_id(self, guess_id: int, similarity: int):
+        """
+        Refine the candidates from the result of a particular guess given by its guess ID.
+        """
+        return CandidateSet(self.lut, self.mask & (self.lut.matrix[guess_id] == similarity))
+
+    def words(self) -> list:
+        return [self.lut.potential_answers[i] for i in self.ids]
+
+    def __and__(self, other):
+        return CandidateSet(self.lut, self.mask & other.mask)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.words())
+
+    def __getitem__(self, i: int) -> str:
+        return self.lut.potential_answers[self.ids[i]]
+
+    def __contains__(self, word: str) -> bool:
+        answer_id = self.lut.answer_ids.get(word)
+        return answer_id is not None and bool(self.mask[answer_id])
+
+    def __repr__(self) -> str:
+        words = self.words()
+        return f'CandidateSet({len(words)}: {" ".join(words[:10])}{" ..." if len(words) > 10 else ""})'
+
+# EOF
@@ -0,0 +1,100 @@
+"""
+Word lists loaded once per process into integer word IDs and letter matrices.
+Words are strings only at the boundaries (files, user input, output); internally guesses and answers are referred to by
+their IDs, i.e. their indices in the lists.
+"""
+
+import os
+import numpy as np
+
+import helper
+
+__author__ = "Z Feng"
+
+guess_file = os.environ.get('WORDLE_GUESS_FILE', 'words_wordle.txt')
+answer_file = os.environ.get('WORDLE_ANSWER_FILE', 'words_wordle_solutions.txt')
+_dictionary = None
+
+
+def read_words(path: str) -> list:
+    """
+    :param path: text file with one word per line, all of equal length
+    :return: list of words
+    """
+    with open(path, 'r') as f:
+        words = f.read().split()
+    assert len({len(word) for word in words}) <= 1, f'{path} has words of different lengths'
+    return words
+
+
+class WordDictionary:
+    """
+    Legal guesses and potential answers with their word IDs, letter matrices and the membership of the guesses in the
+    answers.
+    """
+
+    def __init__(self, legal_guesses: list, potential_answers: list):
+        """
+        :param legal_guesses: list of legal guesses
+        :param potential_answers: list of potential answers
+        """
+        self.legal_guesses = legal_guesses
+        self.potential_answers = potential_answers
+        self.guess_ids = {word: i for i, word in enumerate(legal_guesses)}
+        self.answer_ids = {word: i for i, word in enumerate(potential_answers)}
+        self.guess_letters = helper.encode_words(legal_guesses)  # uint8 of shape (guesses, word length)
+        self.answer_letters = helper.encode_words(potential_answers)
+        # guess ID of every answer, -1 if an answer is not a legal guess
+        self.answer_guess_ids = np.array([self.guess_ids.get(word, -1) for word in potential_answers], dtype=np.intp)
+        # whether every guess is a potential answer
+        self.answer_mask = np.zeros(len(legal_guesses), dtype=bool)
+        self.answer_mask[self.answer_guess_ids[self.answer_guess_ids >= 0]] = True
+
+    def guess_indices(self, guesses: list):
+        """
+        Word IDs of a list of guesses.
+        :param guesses: list of guesses
+        :return: int array of guess IDs, or None if any guess is not in the dictionary
+        """
+        try:
+            return np.array([self.guess_ids[guess] for guess in guesses], dtype=np.intp)
+        except KeyError:
+            return None
+
+    def answer_indices(self, answers: list):
+        """
+        Word IDs of a list of answers.
+        :param answers: list of answers
+        :return: int array of answer IDs, or None if any answer is not in the dictionary
+        """
+        try:
+            return np.array([self.answer_ids[answer] for answer in answers], dtype=np.intp)
+        except KeyError:
+            return None
+
+    def __repr__(self) -> str:
+        return f'WordDictionary({len(self.legal_guesses)} guesses, {len(self.potential_answers)} answers)'
+
+
+def get_dictionary(legal_guesses: list = None, potential_answers: list = None) -> WordDictionary:
+    """
+    :param legal_guesses: list of legal guesses. Default the list of guess_file.
+    :param potential_answers: list of potential answers. Default the list of answer_file.
+    :return: dictionary of the word lists. The dictionary of the default lists is loaded once per process and shared.
+    """
+    global _dictionary
+    if legal_guesses is not None and potential_answers is not None:
+        if _dictionary is None or (legal_guesses is not _dictionary.legal_guesses
+                                   or potential_answers is not _dictionary.potential_answers):
+            return WordDictionary(legal_guesses, potential_answers)
+    if _dictionary is None:
+        _dictionary = WordDictionary(read_words(guess_file), read_words(answer_file))
+    if legal_guesses is None:
+        legal_guesses = _dictionary.legal_guesses
+    if potential_answers is None:
+        potential_answers = _dictionary.potential_answers
+    if legal_guesses is _dictionary.legal_guesses and potential_answers is _dictionary.potential_answers:
+        return _dictionary
+    return WordDictionary(legal_guesses, potential_answers)
+
+# EOF
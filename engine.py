@@ -0,0 +1,105 @@
+"""
+Lazily built engine holding the heavy state shared by the Wordle and Quordle solvers.
+Importing the solvers is free of side effects: the pattern matrix and the initial entropies and probabilities are
+loaded (or built) from the cache only when the engine is first used, and only once per process.
+"""
+
+import time
+import numpy as np
+
+import cache_manager
+import hard_mode
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+__author__ = "Z Feng"
+
+_engine = None
+
+
+class Engine:
+    """
+    Similarity LUT, initial entropies and initial probabilities of the solvers.
+    """
+
+    def __init__(self, cache_dir: str = None, legal_guesses: list = None, potential_answers: list = None):
+        """
+        :param cache_dir: root directory of the artifact cache. Default see cache_manager.
+        :param legal_guesses: list of legal guesses. Default see helper.get_guess_dictionary.
+        :param potential_answers: list of potential answers. Default see helper.get_answer_dictionary.
+        """
+        t_start = time.perf_counter()
+        self.cache = cache_manager.CacheManager(cache_dir, legal_guesses, potential_answers)
+        self.similarity_lut = self.cache.load_pattern_lut()
+        self.initial_entropies = self.cache.load_or_build('initial_entropies', self._build_initial_entropies)
+        self.initial_probabilities = self.cache.load_or_build('initial_probabilities',
+                                                              self._build_initial_probabilities)
+        self.startup_time = time.perf_counter() - t_start
+        self._hard_mode_index = None
+
+    @property
+    def hard_mode_index(self) -> hard_mode.HardModeIndex:
+        """
+        Letter masks and counts of the legal guesses for hard mode, built on first use.
+        """
+        if self._hard_mode_index is None:
+            self._hard_mode_index = hard_mode.HardModeIndex(self.similarity_lut.dictionary)
+        return self._hard_mode_index
+
+    def _build_initial_entropies(self) -> np.ndarray:
+        import solver
+        n_answers = len(self.similarity_lut.potential_answers)
+        return solver.compute_entropy_batch(np.arange(n_answers), pattern_matrix=self.similarity_lut.matrix,
+                                            chunk_size=solver.entropy_chunk_size,
+                                            n_patterns=self.similarity_lut.n_patterns)
+
+    def _build_initial_probabilities(self) -> np.ndarray:
+        guess_ids = self.similarity_lut.answer_guess_ids
+        probabilities = np.zeros(len(self.similarity_lut.legal_guesses))
+        probabilities[guess_ids[guess_ids >= 0]] = 1 / len(self.similarity_lut.potential_answers)
+        return probabilities
+
+    def memory(self) -> dict:
+        """
+        :return: bytes of the memory-mapped pattern matrix, of the arrays in memory and peak RSS of the process
+        """
+        peak_rss = None
+        if resource is not None:
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+        return {'mapped': self.similarity_lut.matrix.nbytes,
+                'arrays': self.initial_entropies.nbytes + self.initial_probabilities.nbytes,
+                'peak_rss': peak_rss}
+
+    def __repr__(self) -> str:
+        memory = self.memory()
+        rss = '' if memory['peak_rss'] is None else f', peak RSS {memory["peak_rss"] / 2 ** 20:.1f} MB'
+        return (f'Engine ready in {self.startup_time:.3f} seconds: {memory["mapped"] / 2 ** 20:.1f} MB mapped, '
+                f'{memory["arrays"] / 2 ** 20:.1f} MB in arrays{rss}')
+
+
+def get_engine() -> Engine:
+    """
+    :return: engine of this process, built on first use
+    """
+    global _engine
+    if _engine is None:
+        _engine = Engine()
+    return _engine
+
+
+def reset_engine(cache_dir: str = None, legal_guesses: list = None, potential_answers: list = None) -> Engine:
+    """
+    Replace the engine of this process by a newly built one.
+    :param cache_dir: root directory of the artifact cache. Default see cache_manager.
+    :param legal_guesses: list of legal guesses. Default see helper.get_guess_dictionary.
+    :param potential_answers: list of potential answers. Default see helper.get_answer_dictionary.
+    :return: new engine
+    """
+    global _engine
+    _engine = Engine(cache_dir, legal_guesses, potential_answers)
+    return _engine
+
+# EOF
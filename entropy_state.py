@@ -0,0 +1,129 @@
+"""
+Incremental entropies of the legal guesses for a shrinking set of candidates.
+"""
+
+import numpy as np
+
+import helper
+from candidates import CandidateSet
+from guess_index import GuessIndex
+
+__author__ = "Z Feng"
+
+rebuild_fraction = 0.5  # the counts are rebuilt when more than this fraction of the candidates is eliminated at once
+count_chunk_size = 1024  # rows of pattern counts computed at once to bound peak memory
+max_counts_bytes = 2 ** 27  # counts larger than this, e.g. of long words with 3^N patterns, are not kept
+
+
+def entropy_table(n: int) -> np.ndarray:
+    """
+    A pattern seen c times among n equally likely answers contributes -p * log2(p) with p = c / n.
+    :param n: number of answers
+    :return: contribution of every count from 0 to n
+    """
+    p = np.arange(n + 1) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy_contributions = - p * np.log2(p)
+    entropy_contributions[np.isnan(entropy_contributions)] = 0
+    return entropy_contributions
+
+
+def count_patterns(rows: np.ndarray, n_patterns: int) -> np.ndarray:
+    """
+    Count the patterns of every row by a single bincount, with each row offset by 3^N so that rows do not collide.
+    :param rows: pattern rows, shape (rows, answers)
+    :param n_patterns: number of patterns 3^N of words of length N
+    :return: counts of shape (rows, 3^N)
+    """
+    codes = rows.astype(np.intp)
+    n_rows = codes.shape[0]
+    codes += np.arange(n_rows, dtype=np.intp)[:, None] * n_patterns
+    return np.bincount(codes.ravel(), minlength=n_rows * n_patterns).reshape(n_rows, n_patterns)
+
+
+class EntropyState(GuessIndex):
+    """
+    Reduction index of the guesses which also keeps the pattern counts of its representatives over the candidates.
+    When the candidates shrink, the patterns of the eliminated answers are subtracted from the counts instead of
+    counting every remaining answer again, and only the guesses still splitting the candidates are evaluated. When
+    more than rebuild_fraction of the candidates are eliminated at once, counting the remaining answers is cheaper and
+    the counts are rebuilt.
+    """
+
+    def __init__(self, lut: helper.PatternLUT):
+        """
+        :param lut: pattern LUT of the guesses
+        """
+        super().__init__(lut)
+        self.counts = None  # pattern counts of the representatives, shape (representatives, 3^N)
+        self.values = None  # entropies of the representatives
+        self.rebuilds = 0
+        self.increments = 0
+
+    def update(self, candidates: CandidateSet) -> None:
+        """
+        Restrict the index, the counts and the entropies to a set of candidates, which must be a subset of those of the
+        previous update. The entropies of every chunk of rows are summed right after its counts are updated, while the
+        counts are still in cache.
+        :param candidates: remaining candidates
+        """
+        previous = self.candidates
+        if previous is not None and np.array_equal(candidates.mask, previous.mask):
+            return
+        previous_rows, previous_representatives = self.rows, self.representatives
+        super().update(candidates)
+        table = entropy_table(len(candidates))
+        self.values = np.empty(len(self.representatives), dtype=float)
+        n_patterns = self.lut.n_patterns
+        if self.counts is None or len(candidates) < (1 - rebuild_fraction) * len(previous):
+            # the smallest type holding every count, which only decrease until the next rebuild
+            dtype = np.min_scalar_type(len(candidates))
+            keep = len(self.representatives) * n_patterns * dtype.itemsize <= max_counts_bytes
+            self.counts = np.empty((len(self.representatives), n_patterns), dtype=dtype) if keep else None
+            for start in range(0, len(self.representatives), count_chunk_size):
+                counts = count_patterns(self.rows[start:start + count_chunk_size], n_patterns)
+                if keep:
+                    self.counts[start:start + len(counts)] = counts
+                self.values[start:start + len(counts)] = np.sum(table[counts], axis=1)
+            self.rebuilds += 1
+            return
+        # the representatives are a subset of the previous ones, and both are sorted by guess ID
+        kept = np.searchsorted(previous_representatives, self.representatives)
+        eliminated_rows = np.take(previous_rows, np.flatnonzero(~candidates.mask[previous.ids]), axis=1)[kept]
+        self.counts = self.counts[kept]
+        for start in range(0, len(self.counts), count_chunk_size):
+            counts = self.counts[start:start + count_chunk_size]
+            counts -= count_patterns(eliminated_rows[start:start + count_chunk_size], n_patterns).astype(counts.dtype)
+            self.values[start:start + len(counts)] = np.sum(table[counts], axis=1)
+        self.increments += 1
+
+    def entropies(self, candidates: CandidateSet) -> np.ndarray:
+        """
+        :param candidates: remaining candidates, a subset of those of the previous update
+        :return: information entropy (in bits) of every legal guess, identical to solver.compute_entropy_batch
+        """
+        self.update(candidates)
+        return self.expand(self.values)
+
+    def refine(self, candidates: CandidateSet, guess_id: int, similarity: int) -> CandidateSet:
+        """
+        Refine the candidates from the result of a guess. If the candidates are those of the last update and the guess
+        splits them, its pattern row is read from the restricted rows already kept, so that filtering and the next
+        update of the counts share one pass over the same rows.
+        :param candidates: candidates to refine from
+        :param guess_id: guess ID of the guessed word
+        :param similarity: similarity between guess and true answer
+        :return: refined candidate set
+        """
+        if (self.candidates is None or self.inverse[guess_id] < 0
+                or not np.array_equal(candidates.mask, self.candidates.mask)):
+            return candidates.refine_id(guess_id, similarity)
+        mask = np.zeros_like(candidates.mask)
+        mask[candidates.ids[self.rows[self.inverse[guess_id]] == similarity]] = True
+        return CandidateSet(self.lut, mask)
+
+    def __repr__(self) -> str:
+        return (f'EntropyState({len(self)} of {len(self.inverse)} guesses split the candidates, '
+                f'{self.rebuilds} rebuilds, {self.increments} incremental updates)')
+
+# EOF
@@ -0,0 +1,173 @@
+"""
+Sampled evaluation of strategies of the automatic solver.
+Answers are played in a seeded random order whose every prefix is a stratified sample of the answers, and the same
+answers are played by every strategy, so that the strategies are compared on paired games. After every batch of games
+the mean guesses of every strategy and its difference to the first strategy are estimated with confidence intervals,
+and the evaluation stops once every interval of the differences is narrower than the requested width. Games are
+recorded per answer in the JSON lines files of the parallel simulator, so that a later evaluation replays none of them.
+"""
+
+import argparse
+import statistics
+import numpy as np
+
+import engine
+import simulator
+
+__author__ = "Z Feng"
+
+n_strata = 10  # strata of the answers, of equal size
+failure_attempts = simulator.max_auto_attempts + 1  # attempts counted for a game the solver does not finish
+
+
+def answer_strata(answers: list) -> np.ndarray:
+    """
+    Stratify the answers by difficulty, measured by the size of the partition they fall in after the opening guess of
+    most entropy. The answers sorted by partition size are cut into n_strata strata of equal size.
+    :param answers: list of potential answers
+    :return: stratum of every answer
+    """
+    shared_engine = engine.get_engine()
+    lut = shared_engine.similarity_lut
+    row = lut.matrix[int(np.argmax(shared_engine.initial_entropies)), lut.answer_indices(answers)]
+    sizes = np.bincount(row, minlength=lut.n_patterns)[row]
+    order = np.argsort(sizes, kind='stable')
+    strata = np.empty(len(answers), dtype=np.intp)
+    strata[order] = np.arange(len(answers)) * min(n_strata, len(answers)) // len(answers)
+    return strata
+
+
+def sample_order(answers: list, strata: np.ndarray, seed: int = 0) -> list:
+    """
+    Order the answers randomly so that every prefix is a stratified sample with proportional allocation. The answers
+    of every stratum are shuffled and spread evenly over the order, from a random offset.
+    :param answers: list of potential answers
+    :param strata: stratum of every answer
+    :param seed: seed of the order
+    :return: answers in sampling order
+    """
+    rng = np.random.default_rng(seed)
+    keys = np.empty(len(answers))
+    for stratum in np.unique(strata):
+        members = rng.permutation(np.flatnonzero(strata == stratum))
+        keys[members] = (np.arange(len(members)) + rng.random()) / len(members)
+    order = np.lexsort((rng.random(len(answers)), keys))
+    return [answers[i] for i in order]
+
+
+def stratified_estimate(values: np.ndarray, strata: np.ndarray, population: np.ndarray, z: float) -> tuple:
+    """
+    Stratified estimate of the mean over every answer from a sample of answers.
+    :param values: value of every sampled answer
+    :param strata: stratum of every sampled answer
+    :param population: number of answers of every stratum
+    :param z: quantile of the standard normal distribution of the confidence level
+    :return: estimated mean and half width of its confidence interval
+    """
+    weights = population / population.sum()
+    pooled_variance = np.var(values, ddof=1) if len(values) > 1 else 0.
+    mean = 0.
+    variance = 0.
+    for stratum, weight in enumerate(weights):
+        sample = values[strata == stratum]
+        if len(sample) == 0:
+            # a stratum not sampled yet counts with the mean and the variance of the whole sample
+            sample_mean, sample_variance, n = np.mean(values), pooled_variance, 1
+        else:
+            sample_mean, n = np.mean(sample), len(sample)
+            sample_variance = np.var(sample, ddof=1) if n > 1 else pooled_variance
+        mean += weight * sample_mean
+        variance += weight ** 2 * (1 - n / population[stratum]) * sample_variance / n
+    return float(mean), float(z * np.sqrt(variance))
+
+
+def evaluate(strategies: list, width: float = 0.05, confidence: float = 0.95, batch_size: int = 100,
+             max_games: int = None, seed: int = 0, workers: int = None, output: str = 'simulation',
+             hard_mode: bool = False) -> dict:
+    """
+    Evaluate strategies on paired samples of answers until the confidence intervals are narrow enough.
+    :param strategies: strategies of the automatic solver. The differences are taken to the first one.
+    :param width: the evaluation stops once every interval of the differences is narrower than this many guesses. With
+    a single strategy, once the interval of its mean is.
+    :param confidence: confidence level of the intervals
+    :param batch_size: answers played by every strategy between two checks
+    :param max_games: maximum number of answers played. Default every answer.
+    :param seed: seed of the sample
+    :param workers: number of worker processes. Default the number of CPUs.
+    :param output: prefix of the JSON lines files recording the games of every strategy, shared with the simulator
+    :param hard_mode: play in hard mode
+    :return: games played, whether the intervals converged, and the mean, interval, failures and time of every
+    strategy and the difference and interval of every strategy to the first
+    """
+    answers = engine.get_engine().similarity_lut.potential_answers
+    strata = answer_strata(answers)
+    population = np.bincount(strata)
+    order = sample_order(answers, strata, seed)
+    stratum_of = dict(zip(answers, strata))
+    if max_games is None:
+        max_games = len(answers)
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    games = 0
+    while True:
+        games = min(games + batch_size, max_games, len(answers))
+        sample = order[:games]
+        sample_strata = np.array([stratum_of[answer] for answer in sample])
+        attempts = []
+        times = []
+        for strategy in strategies:
+            records = {record['answer']: record for record in
+                       simulator.parallel_simulator(sample, strategy, workers,
+                                                    simulator.record_file(output, strategy, hard_mode),
+                                                    hard_mode=hard_mode)}
+            attempts.append(np.array([records[answer]['attempts'] or failure_attempts for answer in sample]))
+            times.append(np.array([records[answer]['time'] for answer in sample]))
+        result = {'games': games, 'confidence': confidence, 'strategies': []}
+        for strategy, strategy_attempts, strategy_times in zip(strategies, attempts, times):
+            mean, half_width = stratified_estimate(strategy_attempts, sample_strata, population, z)
+            difference, difference_half_width = stratified_estimate(strategy_attempts - attempts[0], sample_strata,
+                                                                    population, z)
+            result['strategies'].append({
+                'strategy': strategy, 'mean': mean, 'interval': (mean - half_width, mean + half_width),
+                'failures': int(np.sum(strategy_attempts == failure_attempts)),
+                'time': float(np.mean(strategy_times)), 'difference': difference,
+                'difference_interval': (difference - difference_half_width, difference + difference_half_width)})
+        key = 'difference_interval' if len(strategies) > 1 else 'interval'
+        result['converged'] = all(e[key][1] - e[key][0] <= width for e in result['strategies'][len(strategies) > 1:])
+        print(f'{games} games: ' + ', '.join(f'{e["strategy"]} {e["mean"]:.3f}' for e in result['strategies']))
+        if result['converged'] or games >= min(max_games, len(answers)):
+            return result
+
+
+def print_evaluation(result: dict) -> None:
+    """
+    Print the estimates of an evaluation.
+    :param result: result of evaluate
+    :return: None
+    """
+    print(f'\n{result["games"]} games per strategy, {100 * result["confidence"]:.0f}% confidence intervals, '
+          f'{"converged" if result["converged"] else "not converged"}')
+    print(f'{"strategy":<16}{"mean":>8}{"interval":>18}{"difference":>12}{"interval":>18}{"failed":>8}{"ms/game":>10}')
+    for e in result['strategies']:
+        interval = f'{e["interval"][0]:.3f} - {e["interval"][1]:.3f}'
+        difference_interval = f'{e["difference_interval"][0]:+.3f} - {e["difference_interval"][1]:+.3f}'
+        print(f'{e["strategy"]:<16}{e["mean"]:>8.3f}{interval:>18}{e["difference"]:>+12.3f}{difference_interval:>18}'
+              f'{e["failures"]:>8}{1e3 * e["time"]:>10.1f}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strategies', default='score 2,entropy first',
+                        help="comma separated strategies. The differences are taken to the first one")
+    parser.add_argument('--width', type=float, default=0.05, help="width of the intervals of the differences to reach")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument('--batch', type=int, default=100, help="answers played by every strategy between two checks")
+    parser.add_argument('--max-games', type=int, help="maximum number of answers played. Default every answer")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the sample")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--output', default='simulation', help="prefix of the files recording the games")
+    parser.add_argument('--hard', action='store_true', help="hard mode: every guess must be consistent with all hints")
+    args = parser.parse_args()
+    print_evaluation(evaluate(args.strategies.split(','), args.width, args.confidence, args.batch, args.max_games,
+                              args.seed, args.workers, args.output, args.hard))
+
+# EOF
@@ -0,0 +1,83 @@
+"""
+Reduction index of the legal guesses that still split the remaining candidates.
+"""
+
+import numpy as np
+
+import helper
+from candidates import CandidateSet
+
+__author__ = "Z Feng"
+
+dedupe_max_candidates = 64  # identical rows are only grouped for at most this many candidates, as few are identical
+
+
+class GuessIndex:
+    """
+    Guesses worth evaluating for a shrinking set of candidates. A guess whose pattern row is constant over the
+    candidates gains no information and is dropped, and of several guesses with identical pattern rows only the one of
+    smallest guess ID is kept as representative. Both properties still hold on any subset of the candidates, so every
+    update only re-examines the representatives kept by the previous one.
+    """
+
+    def __init__(self, lut: helper.PatternLUT):
+        """
+        :param lut: pattern LUT of the guesses
+        """
+        self.lut = lut
+        n_guesses = len(lut.legal_guesses)
+        self.representatives = np.arange(n_guesses)  # sorted guess IDs of the representatives
+        self.inverse = np.arange(n_guesses)  # index in representatives of the group of every guess, -1 if constant
+        self.rows = lut.matrix  # pattern rows of the representatives restricted to the candidates
+        self.candidates = None
+
+    def update(self, candidates: CandidateSet) -> None:
+        """
+        Restrict the index to a set of candidates, which must be a subset of those of the previous update.
+        :param candidates: remaining candidates
+        """
+        if self.candidates is not None and np.array_equal(candidates.mask, self.candidates.mask):
+            return
+        if self.candidates is None:
+            rows = np.take(self.rows, candidates.ids, axis=1)
+        else:
+            # columns of the previous candidates that are still candidates
+            rows = np.take(self.rows, np.flatnonzero(candidates.mask[self.candidates.ids]), axis=1)
+        self.candidates = candidates
+        splitting = np.flatnonzero(np.any(rows != rows[:, :1], axis=1))
+        rows = np.ascontiguousarray(rows[splitting])
+        if len(candidates.ids) > dedupe_max_candidates or len(rows) == 0:
+            first, groups = np.arange(len(rows)), np.arange(len(rows))
+        else:
+            # identical rows compare equal as single void scalars, so np.unique groups them in one sort
+            row_keys = rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize))).ravel()
+            _, first, groups = np.unique(row_keys, return_index=True, return_inverse=True)
+            order = np.argsort(first)  # groups in the order of their smallest guess ID
+            first = first[order]
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            groups = rank[groups.ravel()]
+        remap = np.full(len(self.representatives) + 1, -1)  # the extra last entry keeps dropped guesses at -1
+        remap[splitting] = groups
+        self.representatives = self.representatives[splitting][first]
+        self.rows = rows[first]
+        self.inverse = remap[self.inverse]
+
+    def expand(self, values: np.ndarray, fill: float = 0.) -> np.ndarray:
+        """
+        :param values: values of the representatives
+        :param fill: value of the guesses that do not split the candidates
+        :return: values of every guess, copied from the representative of its group
+        """
+        expanded = np.full(len(self.inverse), fill, dtype=np.asarray(values).dtype)
+        grouped = self.inverse >= 0
+        expanded[grouped] = values[self.inverse[grouped]]
+        return expanded
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+    def __repr__(self) -> str:
+        return f'GuessIndex({len(self)} of {len(self.inverse)} guesses split the candidates)'
+
+# EOF
@@ -0,0 +1,128 @@
+"""
+Hard mode: every guess after the first must be consistent with all hints revealed so far, i.e. it would receive the same
+patterns from the previous guesses if it were the answer.
+"""
+
+import numpy as np
+
+from dictionary import WordDictionary
+
+__author__ = "Z Feng"
+
+
+class HardModeIndex:
+    """
+    Per-position letter masks and letter counts of the legal guesses, from which the guesses consistent with a hint are
+    found by a few vectorised boolean operations instead of comparing every word.
+    """
+
+    def __init__(self, word_dictionary: WordDictionary):
+        """
+        :param word_dictionary: dictionary of the legal guesses
+        """
+        self.legal_guesses = word_dictionary.legal_guesses
+        self.guess_ids = word_dictionary.guess_ids
+        letters = word_dictionary.guess_letters
+        n_guesses, N = letters.shape
+        alphabet = np.unique(letters)
+        self.alphabet = {chr(letter): i for i, letter in enumerate(alphabet)}
+        # letter_ids[g, i] is the index in the alphabet of the letter at position i of guess g
+        self.letter_ids = np.searchsorted(alphabet, letters)
+        word_ids = np.arange(n_guesses)
+        # position_masks[i, c] is True for the guesses with letter c at position i
+        self.position_masks = np.zeros((N, len(self.alphabet), n_guesses), dtype=bool)
+        for i in range(N):
+            self.position_masks[i, self.letter_ids[:, i], word_ids] = True
+        # letter_counts[c] is the number of copies of letter c in every guess
+        self.letter_counts = np.zeros((len(self.alphabet), n_guesses), dtype=np.uint8)
+        np.add.at(self.letter_counts, (self.letter_ids, word_ids[:, None]), 1)
+
+    def consistent(self, guess: str, similarity: int) -> np.ndarray:
+        """
+        Guesses consistent with one hint, for a guessed word which may not be a legal guess.
+        :param guess: guessed word
+        :param similarity: similarity received for the guess
+        :return: boolean mask over the legal guesses
+        """
+        if guess in self.guess_ids:
+            return self.consistent_id(self.guess_ids[guess], similarity)
+        return self.consistent_letters([self.alphabet.get(letter, -1) for letter in guess], similarity)
+
+    def consistent_id(self, guess_id: int, similarity: int) -> np.ndarray:
+        """
+        :param guess_id: guess ID of the guessed word
+        :param similarity: similarity received for the guess
+        :return: boolean mask over the legal guesses consistent with the hint
+        """
+        return self.consistent_letters(self.letter_ids[guess_id].tolist(), similarity)
+
+    def consistent_letters(self, letters: list, similarity: int) -> np.ndarray:
+        """
+        Guesses consistent with one hint. A letter marked green must be at its position and a letter not marked green
+        must not be. A letter marked green or yellow k times must appear at least k times, and exactly k times if one of
+        its copies is also marked grey.
+        :param letters: index in the alphabet of every letter of the guessed word, -1 for letters of no legal guess
+        :param similarity: similarity received for the guess
+        :return: boolean mask over the legal guesses
+        """
+        n_guesses = self.letter_counts.shape[1]
+        mask = np.ones(n_guesses, dtype=bool)
+        digits = [similarity // 3 ** i % 3 for i in range(len(letters))]
+        for i, (letter, digit) in enumerate(zip(letters, digits)):
+            if letter < 0:
+                if digit != 0:
+                    return np.zeros(n_guesses, dtype=bool)
+                continue
+            if digit == 2:
+                mask &= self.position_masks[i, letter]
+            else:
+                mask &= ~self.position_masks[i, letter]
+        for letter in set(letters) - {-1}:
+            marked = sum(1 for l, digit in zip(letters, digits) if l == letter and digit > 0)
+            counts = self.letter_counts[letter]
+            if any(l == letter and digit == 0 for l, digit in zip(letters, digits)):
+                mask &= counts == marked
+            elif marked > 0:
+                mask &= counts >= marked
+        return mask
+
+
+class HardModeFilter:
+    """
+    Legal guesses still allowed in a game in hard mode, shrunk incrementally after every hint.
+    """
+
+    def __init__(self, index: HardModeIndex):
+        """
+        :param index: letter masks and counts of the legal guesses
+        """
+        self.index = index
+        self.allowed = np.ones(len(index.legal_guesses), dtype=bool)
+
+    def update(self, guess: str, similarity: int) -> None:
+        """
+        Keep only the guesses consistent with a new hint.
+        :param guess: guessed word
+        :param similarity: similarity received for the guess
+        """
+        self.allowed &= self.index.consistent(guess, similarity)
+
+    def update_id(self, guess_id: int, similarity: int) -> None:
+        """
+        Keep only the guesses consistent with a new hint.
+        :param guess_id: guess ID of the guessed word
+        :param similarity: similarity received for the guess
+        """
+        self.allowed &= self.index.consistent_id(guess_id, similarity)
+
+    def __contains__(self, word: str) -> bool:
+        guess_id = self.index.guess_ids.get(word)
+        return guess_id is not None and bool(self.allowed[guess_id])
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.allowed))
+
+    def __repr__(self) -> str:
+        return f'HardModeFilter({len(self)} of {len(self.allowed)} guesses allowed)'
+
+# EOF
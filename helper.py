@@ -2,6 +2,9 @@
 Helper functions for both simulator and solver.
 """
 
+import hashlib
+import numpy as np
+
 __author__ = "Z Feng"
 
 
@@ -17,44 +20,127 @@ def pattern_to_similarity(pattern: str) -> int:
     return int(pattern[::-1], 3)
 
 
-def similarity_to_pattern(similarity: int) -> str:
+def similarity_to_pattern(similarity: int, length: int = 5) -> str:
     """
-    Inverse of pattern_to_similarity for 5 digit in base 3.
+    Inverse of pattern_to_similarity for length digits in base 3.
     :param similarity: str
+    :param length: number of letters of the words
     :return: pattern
     """
     pattern = ''
-    for i in range(5):
+    for i in range(length):
         pattern += str(similarity % (3 ** (i + 1)) // 3 ** i)
     return pattern
 
 
-def gen_similarity_LUT(legal_guesses: list = None, potential_answers: list = None) -> dict:
+def encode_words(words: list) -> np.ndarray:
+    """
+    Encode a list of words of equal length N as a matrix of letters.
+    :param words: list of words
+    :return: uint8 array of shape (len(words), N)
+    """
+    return np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8).reshape(len(words), -1)
+
+
+def compare_batch(guesses: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Vectorised version of compare. Compare every encoded guess to every encoded target.
+    :param guesses: letter matrix of guesses, shape (G, N), see encode_words
+    :param targets: letter matrix of targets, shape (A, N)
+    :return: similarities of shape (G, A)
+    """
+    N = guesses.shape[1]
+    g = guesses[:, None, :]
+    t = targets[None, :, :]
+    green = g == t
+    similarity = (green * (2 * 3 ** np.arange(N))).sum(axis=2)
+    for i in range(N):
+        letter = g[:, :, i:i + 1]
+        # a letter is yellow if the target has more unmatched copies of it than the earlier part of the guess used up
+        available = ((t == letter) & ~green).sum(axis=2)
+        consumed = ((g[:, :, :i] == letter) & ~green[:, :, :i]).sum(axis=2)
+        similarity += (~green[:, :, i] & (available > consumed)) * 3 ** i
+    return similarity
+
+
+def pattern_dtype(word_length: int) -> np.dtype:
+    """
+    :param word_length: number of letters of the words
+    :return: smallest unsigned integer type holding every similarity from 0 to 3^N - 1
+    """
+    return np.min_scalar_type(3 ** word_length - 1)
+
+
+def gen_pattern_matrix(legal_guesses: list = None, potential_answers: list = None,
+                       chunk_size: int = 256) -> np.ndarray:
     """
-    Generate the lookup table (LUT) of similarities for any guess and answer in the dictionary.
-    LUT returned as a nested dictionary: lut[guess][target] == similarity.
+    Generate the dense pattern matrix of similarities for every guess and answer in the dictionary.
+    matrix[i, j] == compare(legal_guesses[i], potential_answers[j]).
     :param legal_guesses: list of legal guesses
     :param potential_answers: list of potential answers
-    :return: LUT nested dictionary
+    :param chunk_size: number of guesses compared at once
+    :return: array of shape (len(legal_guesses), len(potential_answers)) of the smallest type holding the similarities
     """
     if legal_guesses is None:
         legal_guesses = get_guess_dictionary()
     if potential_answers is None:
         potential_answers = get_answer_dictionary()
-    lut = {guess: {answer: compare(guess, answer) for answer in potential_answers} for guess in legal_guesses}
-    return lut
+    guesses = encode_words(legal_guesses)
+    targets = encode_words(potential_answers)
+    matrix = np.empty((len(legal_guesses), len(potential_answers)), dtype=pattern_dtype(guesses.shape[1]))
+    for start in range(0, len(legal_guesses), chunk_size):
+        matrix[start:start + chunk_size] = compare_batch(guesses[start:start + chunk_size], targets)
+    return matrix
+
 
+class PatternLUT:
+    """
+    Lookup table (LUT) of similarities backed by a dense pattern matrix indexed by word IDs:
+    lut.matrix[lut.guess_ids[guess], lut.answer_ids[answer]] == compare(guess, answer).
+    """
 
-def compare(guess: str, target: str, lut: dict = None) -> int:
+    def __init__(self, matrix: np.ndarray, legal_guesses: list, potential_answers: list):
+        import dictionary
+        assert matrix.shape == (len(legal_guesses), len(potential_answers))
+        self.matrix = matrix
+        self.legal_guesses = legal_guesses
+        self.potential_answers = potential_answers
+        self.dictionary = dictionary.get_dictionary(legal_guesses, potential_answers)
+        self.guess_ids = self.dictionary.guess_ids
+        self.answer_ids = self.dictionary.answer_ids
+        # guess ID of every answer, -1 if an answer is not a legal guess
+        self.answer_guess_ids = self.dictionary.answer_guess_ids
+        self.word_length = self.dictionary.guess_letters.shape[1]
+        self.n_patterns = 3 ** self.word_length  # similarities range from 0 to n_patterns - 1
+        self.solved_similarity = self.n_patterns - 1
+
+    def guess_indices(self, guesses: list):
+        """
+        Word IDs of a list of guesses.
+        :param guesses: list of guesses
+        :return: int array of guess IDs, or None if any guess is not in the LUT
+        """
+        return self.dictionary.guess_indices(guesses)
+
+    def answer_indices(self, answers: list):
+        """
+        Word IDs of a list of answers.
+        :param answers: list of answers
+        :return: int array of answer IDs, or None if any answer is not in the LUT
+        """
+        return self.dictionary.answer_indices(answers)
+
+
+def compare(guess: str, target: str, lut: PatternLUT = None) -> int:
     """
     Compare a guess string to a target string. Return the similarity as an integer in the range of [0, 3^N-1], where
     N is the length of both guess and target strings.
     """
     assert len(guess) == len(target)
     if not lut is None:
-        if guess in lut:
-            if target in lut[guess]:
-                return lut[guess][target]
+        if guess in lut.guess_ids:
+            if target in lut.answer_ids:
+                return int(lut.matrix[lut.guess_ids[guess], lut.answer_ids[target]])
     N = len(guess)
     similarity = 0
     used_target = [False for i in range(N)]
@@ -76,24 +162,37 @@ def compare(guess: str, target: str, lut: dict = None) -> int:
     return similarity
 
 
+def dictionary_hash(legal_guesses: list = None, potential_answers: list = None) -> str:
+    """
+    Content hash of the dictionaries, used to check that cached artifacts were built from the current dictionaries.
+    :param legal_guesses: list of legal guesses
+    :param potential_answers: list of potential answers
+    :return: hex digest
+    """
+    if legal_guesses is None:
+        legal_guesses = get_guess_dictionary()
+    if potential_answers is None:
+        potential_answers = get_answer_dictionary()
+    digest = hashlib.sha256('\n'.join(legal_guesses).encode())
+    digest.update(b'\0')
+    digest.update('\n'.join(potential_answers).encode())
+    return digest.hexdigest()
+
+
 def get_guess_dictionary() -> list:
-    with open('words_wordle.txt', 'r') as f:
-        dictionary = f.readlines()
-    for i in range(len(dictionary)):
-        # print(len(word))
-        assert len(dictionary[i]) == 6
-        dictionary[i] = dictionary[i][:5]
-    return dictionary
+    """
+    :return: list of legal guesses, read once per process. The list is shared, so it must not be modified.
+    """
+    import dictionary
+    return dictionary.get_dictionary().legal_guesses
 
 
 def get_answer_dictionary() -> list:
-    with open('words_wordle_solutions.txt', 'r') as f:
-        dictionary = f.readlines()
-    for i in range(len(dictionary)):
-        # print(len(word))
-        assert len(dictionary[i]) == 6
-        dictionary[i] = dictionary[i][:5]
-    return dictionary
+    """
+    :return: list of potential answers, read once per process. The list is shared, so it must not be modified.
+    """
+    import dictionary
+    return dictionary.get_dictionary().potential_answers
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+"""
+Opt-in instrumentation of the solver, helper and simulator modules.
+When enabled, every function of these modules is replaced by a wrapper counting its calls and cumulative time, and the
+size of the candidate set after every turn of a game is recorded. When disabled, the original functions are in place,
+so instrumentation costs nothing. Sample games can also be profiled to cProfile output or to folded stacks for
+flamegraph.pl and speedscope.
+"""
+
+import argparse
+import cProfile
+import functools
+import inspect
+import os
+import random
+import sys
+import time
+import numpy as np
+
+import engine
+import helper
+import simulator
+import solver
+
+__author__ = "Z Feng"
+
+default_modules = (solver, helper, simulator)
+_originals = []  # (module, name, original function) of every wrapped function
+_stats = {}  # qualified name: [calls, cumulative seconds]
+_active = {}  # qualified name: number of calls in progress, so that recursive calls are timed once
+_turn_sizes = []  # sizes of the candidate set after every turn, one list per game
+
+
+def _wrap(module, name: str, func):
+    qualname = f'{module.__name__}.{name}'
+    stats = _stats.setdefault(qualname, [0, 0.])
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats[0] += 1
+        outermost = _active.get(qualname, 0) == 0
+        _active[qualname] = _active.get(qualname, 0) + 1
+        t_start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _active[qualname] -= 1
+            if outermost:
+                stats[1] += time.perf_counter() - t_start
+        if qualname == 'solver.refine_candidates' and outermost and _turn_sizes:
+            _turn_sizes[-1].append(len(result))
+        return result
+
+    if qualname == 'simulator.play':
+        @functools.wraps(func)
+        def game_wrapper(*args, **kwargs):
+            _turn_sizes.append([])
+            return wrapper(*args, **kwargs)
+        return game_wrapper
+    return wrapper
+
+
+def enable(modules: tuple = default_modules) -> None:
+    """
+    Replace every function of the modules by a counting and timing wrapper. Generator functions are left alone, as
+    the time of a generator is spent between its calls.
+    :param modules: modules to instrument
+    """
+    if _originals:
+        return
+    for module in modules:
+        for name, func in list(vars(module).items()):
+            if (inspect.isfunction(func) and func.__module__ == module.__name__ and not name.startswith('__')
+                    and not inspect.isgeneratorfunction(func)):
+                _originals.append((module, name, func))
+                setattr(module, name, _wrap(module, name, func))
+
+
+def disable() -> None:
+    """
+    Restore the original functions.
+    """
+    while _originals:
+        module, name, func = _originals.pop()
+        setattr(module, name, func)
+
+
+def reset() -> None:
+    """
+    Clear the counters and the recorded candidate-set sizes.
+    """
+    for stats in _stats.values():
+        stats[0], stats[1] = 0, 0.
+    _turn_sizes.clear()
+
+
+def report() -> dict:
+    """
+    :return: calls and cumulative seconds of every function called, and the mean candidate-set size after every turn
+    """
+    turns = max((len(sizes) for sizes in _turn_sizes), default=0)
+    functions = {name: {'calls': calls, 'time': seconds} for name, (calls, seconds) in _stats.items() if calls}
+    return {'functions': functions,
+            'turn_sizes': [float(np.mean([sizes[turn] for sizes in _turn_sizes if len(sizes) > turn]))
+                           for turn in range(turns)],
+            'games': len(_turn_sizes)}
+
+
+def print_report(lines: int = 20) -> None:
+    """
+    Print the functions of most cumulative time and the mean candidate-set size after every turn.
+    :param lines: number of functions printed
+    :return: None
+    """
+    instrument_report = report()
+    functions = sorted(instrument_report['functions'].items(), key=lambda e: e[1]['time'], reverse=True)
+    print(f'{"function":<40}{"calls":>10}{"time (s)":>12}{"us/call":>10}')
+    for name, stats in functions[:lines]:
+        print(f'{name:<40}{stats["calls"]:>10}{stats["time"]:>12.3f}{1e6 * stats["time"] / stats["calls"]:>10.1f}')
+    print(f'\nCandidates after every turn over {instrument_report["games"]} games')
+    for turn, size in enumerate(instrument_report['turn_sizes']):
+        print(f'{turn + 1}\t{size:.1f}')
+
+
+def folded_stacks(func) -> dict:
+    """
+    Run a function under a tracing profiler recording the exclusive time of every call stack.
+    :param func: function without arguments
+    :return: exclusive seconds of every stack, keyed by the function names of the stack joined by ';'
+    """
+    stacks = {}
+    frames = []  # [name, start time, time of the calls made]
+
+    def tracer(frame, event, arg):
+        now = time.perf_counter()
+        if event in ('call', 'c_call'):
+            if event == 'call':
+                name = f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}'
+            else:
+                name = getattr(arg, '__qualname__', repr(arg))
+            frames.append([name, now, 0.])
+        elif frames:  # returns of the frames entered before tracing started are ignored
+            name, t_start, inner = frames.pop()
+            elapsed = now - t_start
+            key = ';'.join([f[0] for f in frames] + [name])
+            stacks[key] = stacks.get(key, 0.) + elapsed - inner
+            if frames:
+                frames[-1][2] += elapsed
+
+    sys.setprofile(tracer)
+    try:
+        func()
+    finally:
+        sys.setprofile(None)
+    return stacks
+
+
+def profile_games(answers: list, strategy: str = 'score 2', output: str = 'profile', fmt: str = 'prof') -> str:
+    """
+    Profile sample games played in this process.
+    :param answers: answers of the games
+    :param strategy: strategy of the automatic solver
+    :param output: path of the output without extension
+    :param fmt: 'prof' for cProfile output (pstats, snakeviz), 'folded' for folded stacks (flamegraph.pl, speedscope)
+    :return: path of the output
+    """
+    def play_all():
+        for answer in answers:
+            simulator.play(answer, strategy)
+
+    path = f'{output}.{fmt}'
+    if fmt == 'prof':
+        profiler = cProfile.Profile()
+        profiler.runcall(play_all)
+        profiler.dump_stats(path)
+    elif fmt == 'folded':
+        stacks = folded_stacks(play_all)
+        with open(path, 'w') as f:
+            for stack, seconds in stacks.items():
+                if seconds >= 1e-6:
+                    f.write(f'{stack} {int(seconds * 1e6)}\n')  # microseconds
+    else:
+        raise ValueError(f'Unknown format {fmt}')
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strategy', default='score 2', help="strategy of the automatic solver")
+    parser.add_argument('--games', type=int, default=50, help="number of sample games")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the sample of answers")
+    parser.add_argument('--profile', choices=('prof', 'folded'), help="also profile the games to this format")
+    parser.add_argument('--output', default='profile', help="path of the profile without extension")
+    args = parser.parse_args()
+    sample = random.Random(args.seed).sample(engine.get_engine().similarity_lut.potential_answers, args.games)
+    enable()
+    for sample_answer in sample:
+        simulator.play(sample_answer, args.strategy)
+    print_report()
+    disable()
+    if args.profile is not None:
+        solver.decision_cache.entries.clear()  # profile the decisions rather than the cache lookups
+        print(f'Profile written to {profile_games(sample, args.strategy, args.output, args.profile)}')
+
+# EOF
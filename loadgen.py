@@ -0,0 +1,91 @@
+"""
+Load generator for the solver service (server.py). Concurrent clients post random game histories of one to three turns
+and the client-side latency percentiles and throughput are printed with the counters of the service.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+import helper
+
+__author__ = "Z Feng"
+
+
+def random_history(rng: random.Random, legal_guesses: list, potential_answers: list) -> dict:
+    """
+    :return: request of a game against a random answer with one to three random guesses
+    """
+    answer = rng.choice(potential_answers)
+    guesses = [rng.choice(legal_guesses) for i in range(rng.randint(1, 3))]
+    patterns = [helper.similarity_to_pattern(helper.compare(guess, answer), len(answer)) for guess in guesses]
+    return {'guesses': guesses, 'patterns': patterns, 'strategy': 'score 2', 'top': 5}
+
+
+def post(url: str, request: dict) -> dict:
+    data = json.dumps(request).encode()
+    http_request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(http_request) as response:
+        return json.loads(response.read())
+
+
+def run(url: str = 'http://127.0.0.1:8000', concurrency: int = 8, requests: int = 400, seed: int = 0) -> dict:
+    """
+    Send requests from concurrent clients.
+    :param url: base URL of the service
+    :param concurrency: number of client threads
+    :param requests: total number of requests
+    :param seed: seed of the random histories
+    :return: client-side statistics
+    """
+    rng = random.Random(seed)
+    legal_guesses = helper.get_guess_dictionary()
+    potential_answers = helper.get_answer_dictionary()
+    histories = [random_history(rng, legal_guesses, potential_answers) for i in range(requests)]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(index: int) -> None:
+        for history in histories[index::concurrency]:
+            t_start = time.perf_counter()
+            try:
+                post(url + '/suggest', history)
+            except (urllib.error.URLError, ConnectionError) as error:
+                with lock:
+                    errors.append(repr(error))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t_start)
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - t_start
+    return {'requests': len(latencies), 'errors': len(errors), 'wall_time': wall_time,
+            'throughput': len(latencies) / wall_time,
+            'p50_ms': float(np.percentile(latencies, 50) * 1e3) if latencies else None,
+            'p99_ms': float(np.percentile(latencies, 99) * 1e3) if latencies else None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help="base URL of the service")
+    parser.add_argument('--concurrency', type=int, default=8, help="number of concurrent clients")
+    parser.add_argument('--requests', type=int, default=400, help="total number of requests")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random histories")
+    args = parser.parse_args()
+    client_stats = run(args.url, args.concurrency, args.requests, args.seed)
+    print('client ' + json.dumps(client_stats, indent=2))
+    with urllib.request.urlopen(args.url + '/stats') as stats_response:
+        print('service ' + json.dumps(json.loads(stats_response.read()), indent=2))
+
+# EOF
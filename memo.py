@@ -0,0 +1,140 @@
+"""
+Memoisation of solver decisions keyed by the game state.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict, deque
+import numpy as np
+
+import cache_manager
+import engine
+import helper
+
+__author__ = "Z Feng"
+
+
+class DecisionCache:
+    """
+    LRU cache of the guess ID of the best next guess keyed by a canonical fingerprint of the remaining-candidate set
+    and the strategy.
+    Many different answers lead to the same set of remaining candidates, e.g. every game that opens with the same guess
+    and receives the same pattern, so the decision made in that state can be reused.
+    """
+
+    def __init__(self, max_size: int = 2 ** 16):
+        """
+        :param max_size: maximal number of decisions kept. The least recently used decision is evicted first.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.added = deque(maxlen=max_size)  # decisions added since the last drain, the oldest dropped first
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(answer_ids: np.ndarray, strategy: str, allowed: np.ndarray = None) -> str:
+        """
+        Canonical fingerprint of a game state. Answer IDs only make sense for the word lists of the engine, so the key
+        of its cache directory, a hash of the word lists and the cache version, is part of the fingerprint.
+        :param answer_ids: answer IDs of the remaining candidates, in any order
+        :param strategy: strategy of the solver
+        :param allowed: boolean mask of the guesses allowed in hard mode, None in normal mode
+        :return: hex digest
+        """
+        digest = hashlib.blake2b(np.sort(np.asarray(answer_ids)).astype(np.uint32).tobytes(), digest_size=16)
+        digest.update(engine.get_engine().cache.key.encode())
+        digest.update(strategy.encode())
+        if allowed is not None:
+            digest.update(b'hard')
+            digest.update(np.packbits(allowed).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """
+        Look up a decision and count a hit or a miss.
+        :param key: fingerprint of the game state
+        :return: guess ID, or None if the state has not been seen
+        """
+        guess_id = self.entries.get(key)
+        if guess_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return guess_id
+
+    def put(self, key: str, guess_id: int) -> None:
+        """
+        Store a decision, evicting the least recently used one if the cache is full.
+        :param key: fingerprint of the game state
+        :param guess_id: guess ID of the best next guess
+        """
+        self.entries[key] = guess_id
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        self.added.append((key, guess_id))
+
+    def update(self, decisions: list) -> None:
+        """
+        Store a list of (key, guess ID) decisions, e.g. those drained from another process.
+        """
+        for key, guess_id in decisions:
+            self.put(key, guess_id)
+
+    def drain(self) -> list:
+        """
+        :return: list of (key, guess ID) decisions added since the last drain
+        """
+        added = list(self.added)
+        self.added.clear()
+        return added
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    @staticmethod
+    def version() -> dict:
+        """
+        Fingerprints index the answers of the word lists of the engine, so saved decisions are only valid for the same
+        word lists and artifact version.
+        :return: hash of the word lists of the engine and version of the cache
+        """
+        lut = engine.get_engine().similarity_lut
+        return {'dictionary_hash': helper.dictionary_hash(lut.legal_guesses, lut.potential_answers),
+                'cache_version': cache_manager.cache_version}
+
+    def save(self, path: str) -> None:
+        """
+        Save the decisions as JSON, least recently used first, with the version they are valid for.
+        """
+        with open(path, 'w') as f:
+            json.dump({**self.version(), 'max_size': self.max_size, 'entries': list(self.entries.items())}, f)
+
+    def load(self, path: str) -> None:
+        """
+        Load decisions saved by save() if the file exists. A file saved for other word lists or another cache version
+        is ignored.
+        """
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            if any(saved.get(field) != value for field, value in self.version().items()):
+                print(f'Ignoring {path}, saved for other word lists or another cache version')
+                return
+            for key, guess_id in saved['entries']:
+                self.entries[key] = guess_id
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return (f'DecisionCache({len(self)}/{self.max_size} decisions, {self.hits} hits, {self.misses} misses, '
+                f'hit rate {self.hit_rate():.1%})')
+
+# EOF
@@ -0,0 +1,145 @@
+"""
+Opening book: the precomputed decision tree of the automatic solver for a fixed strategy.
+For a fixed strategy, auto_solver is deterministic: every node of the tree is a guess, and every pattern received
+leads to the next node. Walking the tree once allows a lookup-only solver that answers every turn in constant time.
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+import engine
+import helper
+import solver
+from candidates import CandidateSet
+
+__author__ = "Z Feng"
+
+max_depth = 10
+
+
+class OpeningBook:
+    """
+    Decision tree stored as flat arrays. Node 0 is the root, guesses[node] is the guess ID played at the node and
+    children[node, similarity] is the next node, or -1 if the pattern cannot be received (or solves the puzzle).
+    """
+
+    def __init__(self, strategy: str, guesses: np.ndarray, children: np.ndarray, depths: np.ndarray,
+                 dictionary_hash: str):
+        """
+        :param strategy: strategy the tree was built with
+        :param guesses: guess ID of every node
+        :param children: next node for every node and similarity
+        :param depths: depths[d] is the number of answers solved in d + 1 attempts
+        :param dictionary_hash: content hash of the dictionaries the tree was built from
+        """
+        self.strategy = strategy
+        self.guesses = guesses
+        self.children = children
+        self.depths = depths
+        self.dictionary_hash = dictionary_hash
+
+    def save(self, path: str) -> None:
+        meta = {'strategy': self.strategy, 'dictionary_hash': self.dictionary_hash, 'depths': self.depths.tolist()}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, guesses=self.guesses, children=self.children, meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str, legal_guesses: list = None, potential_answers: list = None):
+        """
+        Load an opening book and check it was built from the current dictionaries.
+        :param path: path of the .npz file
+        :param legal_guesses: list of legal guesses. Default the legal guesses of the engine.
+        :param potential_answers: list of potential answers. Default the potential answers of the engine.
+        :return: opening book
+        """
+        if legal_guesses is None:
+            legal_guesses = engine.get_engine().similarity_lut.legal_guesses
+        if potential_answers is None:
+            potential_answers = engine.get_engine().similarity_lut.potential_answers
+        with np.load(path) as npz:
+            meta = json.loads(str(npz['meta']))
+            book = cls(meta['strategy'], npz['guesses'], npz['children'], np.array(meta['depths']),
+                       meta['dictionary_hash'])
+        if book.dictionary_hash != helper.dictionary_hash(legal_guesses, potential_answers):
+            raise ValueError(f'{path} was built from different dictionaries. Please export it again.')
+        return book
+
+    def mean_attempts(self) -> float:
+        return float(np.sum(self.depths * np.arange(1, len(self.depths) + 1)) / np.sum(self.depths))
+
+    def print_depths(self) -> None:
+        print(f'{len(self.guesses)} nodes for strategy {self.strategy!r}')
+        print('attempts\tgames')
+        for depth, count in enumerate(self.depths):
+            if count:
+                print(f'{depth + 1}\t\t\t{count}')
+        print(f'Solver finishes in {self.mean_attempts(): .3f} attempts on average!')
+
+
+def build_book(strategy: str = 'score 2', do_print: bool = True) -> OpeningBook:
+    """
+    Walk the decision tree of auto_solver for a given strategy over every potential answer.
+    :param strategy: 'entropy first', 'score 1', 'score 2'
+    :param do_print: print progress or not
+    :return: opening book
+    """
+    lut = engine.get_engine().similarity_lut
+    legal_guesses = lut.legal_guesses
+    potential_answers = lut.potential_answers
+    candidates = CandidateSet.full(lut)
+    guesses = []
+    children = []
+    depths = np.zeros(max_depth, dtype=np.int64)
+
+    def expand(answers: CandidateSet, depth: int) -> int:
+        guess_id = solver.next_guess(strategy, legal_guesses, answers, first_attempt=depth == 0)
+        node = len(guesses)
+        guesses.append(guess_id)
+        children.append(np.full(lut.n_patterns, -1, dtype=np.int32))
+        for similarity in np.unique(lut.matrix[guess_id, answers.ids]):
+            if similarity == lut.solved_similarity:
+                depths[depth] += 1
+            elif depth + 1 < max_depth:
+                children[node][similarity] = expand(answers.refine_id(guess_id, similarity), depth + 1)
+        if do_print and depth == 1:
+            print(f'{node + 1} nodes, {depths.sum()}/{len(potential_answers)} answers solved')
+        return node
+
+    expand(candidates, 0)
+    # the smallest type holding every guess ID, which is more than uint16 for lists of more than 65536 guesses
+    guess_dtype = np.min_scalar_type(len(legal_guesses) - 1)
+    return OpeningBook(strategy, np.array(guesses, dtype=guess_dtype), np.array(children),
+                       depths[:np.max(np.nonzero(depths)) + 1],
+                       helper.dictionary_hash(legal_guesses, potential_answers))
+
+
+def book_solver(book: OpeningBook):
+    """
+    Generator object with the interface of solver.auto_solver that only looks its guesses up in an opening book.
+    :param book: opening book
+    """
+    lut = engine.get_engine().similarity_lut
+    node = 0
+    while True:
+        yield lut.legal_guesses[book.guesses[node]]
+        similarity = yield
+        node = book.children[node, similarity]
+        if node < 0:
+            pattern = helper.similarity_to_pattern(similarity, lut.word_length)
+            raise KeyError(f'Pattern {pattern} is not in the opening book')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strategy', default='score 2', help="strategy of the automatic solver")
+    parser.add_argument('--output', help="path of the exported book. Default book_<strategy>.npz")
+    args = parser.parse_args()
+    t_start = time.time()
+    opening_book = build_book(args.strategy)
+    opening_book.save(args.output or f'book_{args.strategy.replace(" ", "_")}.npz')
+    opening_book.print_depths()
+    print(f'Finished in {time.time() - t_start: .3f} seconds!')
+
+# EOF
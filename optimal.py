@@ -0,0 +1,308 @@
+"""
+Offline search of the decision tree minimising the expected (or the worst-case) number of guesses.
+The search recurses over candidate sets with memoisation keyed by the set, and prunes guesses by branch and bound with
+lower bounds computed from the pattern histogram of every guess. The first level is fixed by a root guess, and the
+subtrees of its partitions are searched in parallel, with a checkpoint file so that an interrupted search resumes.
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import engine
+import helper
+import opening_book
+import simulator
+from candidates import CandidateSet
+from entropy_state import count_patterns, entropy_table
+
+__author__ = "Z Feng"
+
+
+
+class OptimalSearch:
+    """
+    Branch-and-bound search over candidate sets.
+    For the 'mean' objective, the cost of a set is the total number of guesses needed to solve every answer of the set,
+    so the expected number of guesses is the cost divided by the size of the set. For the 'worst' objective, the cost is
+    the number of guesses needed in the worst case.
+    """
+
+    def __init__(self, objective: str = 'mean', guess_limit: int = None):
+        """
+        :param objective: 'mean' or 'worst'
+        :param guess_limit: number of guesses evaluated per set, best lower bound first, on top of the answers of the
+        set. Default all legal guesses, which makes the search exact.
+        """
+        if objective not in ('mean', 'worst'):
+            raise ValueError(f'objective must be mean or worst, not {objective!r}')
+        self.objective = objective
+        self.guess_limit = guess_limit
+        self.lut = engine.get_engine().similarity_lut
+        self.memo = {}  # set -> (exact cost, best guess ID)
+        self.lower = {}  # set -> lower bound of the cost, from searches cut by their budget
+        self.nodes = 0
+
+    def part_bounds(self, sizes: np.ndarray) -> np.ndarray:
+        """
+        Lower bounds of the cost of sets of given sizes. For the mean, 1 answer needs 1 guess, and every answer of a
+        larger set but the one guessed first needs at least 2 guesses. For the worst case, the information bound: a
+        guess splits a set into at most 3^N parts, so d guesses tell at most 3^(N * (d - 1)) answers apart.
+        """
+        sizes = np.asarray(sizes)
+        if self.objective == 'mean':
+            return np.where(sizes > 0, 2 * sizes - 1, 0)
+        bounds = np.where(sizes > 0, 1, 0)
+        capacity = 1
+        while np.any(sizes > capacity):
+            bounds[sizes > capacity] += 1
+            capacity *= self.lut.n_patterns
+        return bounds
+
+    def separating_guess(self, answer_ids: np.ndarray):
+        """
+        A set is solved within 2 guesses in the worst case only if a guess gives every answer of the set its own
+        pattern. The answers are added one at a time, and the guesses giving the new answer the pattern of a previous
+        one are dropped, so that after a few answers only a few guesses are left to check.
+        :param answer_ids: answer IDs of the set
+        :return: guess ID of a guess telling every answer apart, or None if there is none
+        """
+        if len(answer_ids) > self.lut.n_patterns:
+            return None
+        guess_ids = np.arange(self.lut.matrix.shape[0])
+        codes = np.empty((len(guess_ids), 0), dtype=self.lut.matrix.dtype)
+        for answer_id in answer_ids:
+            column = self.lut.matrix[guess_ids, answer_id]
+            distinct = np.all(codes != column[:, None], axis=1)
+            guess_ids = guess_ids[distinct]
+            if len(guess_ids) == 0:
+                return None
+            codes = np.column_stack((codes[distinct], column[distinct]))
+        return int(guess_ids[0])
+
+    def candidate_guesses(self, answer_ids: np.ndarray) -> tuple:
+        """
+        Legal guesses worth evaluating for a set, sorted by the lower bound of their cost, then by entropy.
+        Guesses that do not split the set are dropped.
+        :param answer_ids: answer IDs of the set
+        :return: guess IDs and lower bounds of their cost
+        """
+        n = len(answer_ids)
+        counts = count_patterns(np.take(self.lut.matrix, answer_ids, axis=1), self.lut.n_patterns)
+        part_counts = counts[:, :self.lut.solved_similarity]
+        if self.objective == 'mean':
+            # sum of 2 * size - 1 over the non-empty parts not solved by the guess
+            bounds = n + 2 * (n - counts[:, self.lut.solved_similarity]) - np.count_nonzero(part_counts, axis=1)
+        else:
+            largest = part_counts.max(axis=1)
+            bounds = 1 + self.part_bounds(largest)
+        entropies = entropy_table(n)[counts].sum(axis=1)
+        useful = counts.max(axis=1) < n
+        useful[self.lut.answer_guess_ids[answer_ids]] = True  # an answer of the set may still be guessed right
+        guess_ids = np.flatnonzero(useful)
+        if self.objective == 'mean':
+            guess_ids = guess_ids[np.lexsort((-entropies[guess_ids], bounds[guess_ids]))]
+        else:
+            # guesses leaving the smallest largest part first, which are the likeliest to have the best worst case
+            guess_ids = guess_ids[np.lexsort((-entropies[guess_ids], largest[guess_ids], bounds[guess_ids]))]
+        if self.guess_limit is not None:
+            answer_guesses = np.isin(guess_ids, self.lut.answer_guess_ids[answer_ids])
+            keep = answer_guesses | (np.cumsum(~answer_guesses) <= self.guess_limit)
+            guess_ids = guess_ids[keep]
+        return guess_ids, bounds[guess_ids]
+
+    def search(self, answer_ids: np.ndarray, budget: float = np.inf) -> float:
+        """
+        Cost of the best decision tree for a set.
+        :param answer_ids: sorted answer IDs of the set
+        :param budget: cost at which the search may stop, since a better tree is known elsewhere
+        :return: the exact cost if it is below the budget, otherwise a lower bound of at least the budget
+        """
+        n = len(answer_ids)
+        if n <= 2:
+            return (2 * n - 1) if self.objective == 'mean' else n
+        key = answer_ids.tobytes()
+        if key in self.memo:
+            return self.memo[key][0]
+        if self.lower.get(key, 0) >= budget:
+            return self.lower[key]
+        self.nodes += 1
+        if self.objective == 'worst':
+            guess_id = self.separating_guess(answer_ids)
+            if guess_id is not None:
+                self.memo[key] = (2, guess_id)
+                return 2
+            # no guess tells every answer apart, so at least 3 guesses are needed
+            bound = max(3, int(self.part_bounds([n])[0]))
+            if bound >= budget:
+                self.lower[key] = max(self.lower.get(key, 0), bound)
+                return self.lower[key]
+        best, best_guess = np.inf, None
+        guess_ids, bounds = self.candidate_guesses(answer_ids)
+        for guess_id, bound in zip(guess_ids, bounds):
+            threshold = min(best, budget)
+            if bound >= threshold:
+                break
+            similarities = self.lut.matrix[guess_id, answer_ids]
+            order = np.argsort(similarities, kind='stable')
+            sorted_similarities = similarities[order]
+            boundaries = np.flatnonzero(np.diff(sorted_similarities)) + 1
+            starts = np.concatenate(([0], boundaries))
+            parts = [part for start, part in zip(starts, np.split(answer_ids[order], boundaries))
+                     if sorted_similarities[start] != self.lut.solved_similarity]
+            parts.sort(key=len, reverse=True)
+            part_bounds = self.part_bounds(np.array([len(part) for part in parts]))
+            if self.objective == 'mean':
+                cost, remaining = n, int(part_bounds.sum())
+                for part, part_bound in zip(parts, part_bounds):
+                    remaining -= part_bound
+                    cost += self.search(np.sort(part), threshold - cost - remaining)
+                    if cost + remaining >= threshold:
+                        cost = np.inf  # pruned before all parts are searched
+                        break
+            else:
+                cost = 1 + (max(part_bounds) if parts else 0)
+                for part in parts:
+                    if cost >= threshold:
+                        break
+                    cost = max(cost, 1 + self.search(np.sort(part), threshold - 1))
+            if cost < threshold:
+                best, best_guess = cost, guess_id
+        if best < budget:
+            self.memo[key] = (best, best_guess)
+            return best
+        self.lower[key] = max(self.lower.get(key, 0), budget)
+        return budget
+
+    def tree(self, answer_ids: np.ndarray) -> dict:
+        """
+        Best decision tree of a set already searched.
+        :param answer_ids: sorted answer IDs of the set
+        :return: nested dictionary {'guess': word, 'solved': whether the guess may be the answer,
+        'children': {pattern: subtree}}
+        """
+        if len(answer_ids) <= 2:
+            guess_id = self.lut.answer_guess_ids[answer_ids[0]]
+        else:
+            guess_id = self.memo[answer_ids.tobytes()][1]
+        similarities = self.lut.matrix[guess_id, answer_ids]
+        children = {}
+        for similarity in np.unique(similarities):
+            if similarity != self.lut.solved_similarity:
+                children[helper.similarity_to_pattern(int(similarity), self.lut.word_length)] = self.tree(
+                    answer_ids[similarities == similarity])
+        return {'guess': self.lut.legal_guesses[guess_id],
+                'solved': bool(np.any(similarities == self.lut.solved_similarity)), 'children': children}
+
+
+def search_partition(task: tuple, objective: str = 'mean', guess_limit: int = None) -> dict:
+    """
+    Search the best subtree of one partition of the root guess, in a worker process.
+    :param task: root guess, its pattern and answer IDs of the partition
+    :return: record with the pattern, size, cost, subtree, nodes searched and wall time
+    """
+    t_start = time.time()
+    root_guess, pattern, answer_ids = task
+    optimal_search = OptimalSearch(objective, guess_limit)
+    cost = optimal_search.search(answer_ids)
+    return {'root': root_guess, 'pattern': pattern, 'objective': objective, 'guess_limit': guess_limit,
+            'size': len(answer_ids), 'cost': float(cost), 'tree': optimal_search.tree(answer_ids),
+            'nodes': optimal_search.nodes, 'time': time.time() - t_start}
+
+
+def solve_root(root_guess: str = 'soare', objective: str = 'mean', guess_limit: int = None, workers: int = None,
+               checkpoint: str = 'optimal.jsonl') -> dict:
+    """
+    Search the best tree starting with a root guess, searching the partitions of the root guess in parallel. Every
+    searched partition is appended to the checkpoint file, and partitions already in it are not searched again.
+    :param root_guess: first guess
+    :param objective: 'mean' or 'worst'
+    :param guess_limit: number of guesses evaluated per set on top of its answers. Default all, which is exact.
+    :param workers: number of worker processes. Default the number of CPUs.
+    :param checkpoint: path of the JSON lines checkpoint file
+    :return: tree of the search
+    """
+    lut = engine.get_engine().similarity_lut
+    candidates = CandidateSet.full(lut)
+    similarities = lut.matrix[lut.guess_ids[root_guess], candidates.ids]
+    tasks = [(root_guess, helper.similarity_to_pattern(int(similarity), lut.word_length),
+              candidates.ids[similarities == similarity])
+             for similarity in np.unique(similarities) if similarity != lut.solved_similarity]
+    records = {record['pattern']: record for record in simulator.load_records(checkpoint)
+               if (record['root'], record['objective'], record['guess_limit']) == (root_guess, objective, guess_limit)}
+    todo = sorted([task for task in tasks if task[1] not in records], key=lambda task: len(task[2]), reverse=True)
+    print(f'{len(records)} partitions searched, {len(todo)} partitions to search with {workers or os.cpu_count()} '
+          f'workers')
+    t_start = time.time()
+    nodes = 0
+    with open(checkpoint, 'a') as f, multiprocessing.Pool(workers) as pool:
+        search = functools.partial(search_partition, objective=objective, guess_limit=guess_limit)
+        for i, record in enumerate(pool.imap_unordered(search, todo)):
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            records[record['pattern']] = record
+            nodes += record['nodes']
+            print(f'{i + 1}/{len(todo)}: {record["pattern"]} {record["size"]} answers, cost {record["cost"]:.0f}, '
+                  f'{record["nodes"] / max(record["time"], 1e-9):.0f} nodes/s, '
+                  f'{nodes / (time.time() - t_start):.0f} nodes/s overall')
+    costs = [records[task[1]]['cost'] for task in tasks]
+    if objective == 'mean':
+        print(f'Expected number of guesses: {(len(candidates) + sum(costs)) / len(candidates): .4f}')
+    else:
+        print(f'Worst-case number of guesses: {1 + max(costs): .0f}')
+    return {'guess': root_guess, 'solved': root_guess in lut.answer_ids,
+            'children': {task[1]: records[task[1]]['tree'] for task in tasks}}
+
+
+def tree_to_book(tree: dict, strategy: str) -> opening_book.OpeningBook:
+    """
+    Convert a tree of the search to an opening book, e.g. to play it by opening_book.book_solver.
+    :param tree: nested dictionary {'guess': word, 'children': {pattern: subtree}}
+    :param strategy: name of the strategy recorded in the book
+    :return: opening book
+    """
+    lut = engine.get_engine().similarity_lut
+    guesses = []
+    children = []
+    depths = np.zeros(opening_book.max_depth, dtype=np.int64)
+
+    def flatten(subtree: dict, depth: int) -> int:
+        node = len(guesses)
+        guesses.append(lut.guess_ids[subtree['guess']])
+        children.append(np.full(lut.n_patterns, -1, dtype=np.int32))
+        if subtree['solved']:
+            depths[depth] += 1
+        for pattern, child in subtree['children'].items():
+            children[node][helper.pattern_to_similarity(pattern)] = flatten(child, depth + 1)
+        return node
+
+    flatten(tree, 0)
+    guess_dtype = np.min_scalar_type(len(lut.legal_guesses) - 1)
+    return opening_book.OpeningBook(strategy, np.array(guesses, dtype=guess_dtype), np.array(children),
+                                    depths[:np.max(np.nonzero(depths)) + 1],
+                                    helper.dictionary_hash(lut.legal_guesses, lut.potential_answers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--root', default='soare', help="first guess")
+    parser.add_argument('--objective', choices=('mean', 'worst'), default='mean', help="cost minimised")
+    parser.add_argument('--guess-limit', type=int, help="guesses evaluated per set on top of its answers. "
+                                                        "Default all legal guesses, which makes the search exact")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--checkpoint', default='optimal.jsonl', help="JSON lines file of searched partitions")
+    parser.add_argument('--output', help="export the tree as an opening book to this file")
+    args = parser.parse_args()
+    t_start = time.time()
+    optimal_tree = solve_root(args.root, args.objective, args.guess_limit, args.workers, args.checkpoint)
+    book = tree_to_book(optimal_tree, f'optimal {args.objective}')
+    book.print_depths()
+    if args.output is not None:
+        book.save(args.output)
+    print(f'Finished in {time.time() - t_start: .3f} seconds!')
+
+# EOF
@@ -4,6 +4,7 @@ Puzzle generator
 
 import random
 
+import dictionary
 import helper
 
 __author__ = "Z Feng"
@@ -16,8 +17,8 @@ def random_puzzle(debug: bool =False) -> None:
     :param debug: Debug mode. Default False. If turned True, the user would know the answer initially.
     :return: None
     """
-    potential_answers = helper.get_answer_dictionary()
-    legal_guesses = helper.get_guess_dictionary()
+    word_dictionary = dictionary.get_dictionary()
+    potential_answers = word_dictionary.potential_answers
     answer = potential_answers[random.randint(0, len(potential_answers) - 1)]
     if debug:
         print(answer)
@@ -26,15 +27,15 @@ def random_puzzle(debug: bool =False) -> None:
             guess = input(f'\nAttempt {attempt + 1} / {max_attempts}. Please enter your guess\n')
             if guess == 'q':
                 quit()
-            elif not guess in legal_guesses:
+            elif not guess in word_dictionary.guess_ids:
                 print(guess, 'is not a word!')
-            elif len(guess) == 5:
+            elif len(guess) == len(answer):
                 break
         similarity = helper.compare(guess, answer)
-        if similarity == 3 ** 5 - 1:
+        if similarity == 3 ** len(answer) - 1:
             print('Correct! Congratulations!')
             exit()
-        pattern = helper.similarity_to_pattern(similarity)
+        pattern = helper.similarity_to_pattern(similarity, len(answer))
         print('The pattern is', pattern)
     print('Gave over! The answer is', answer)
 
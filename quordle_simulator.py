@@ -0,0 +1,131 @@
+"""
+Simulator for testing the solver of Quordle puzzles.
+The 2315^4 tuples of answers are too many to go through, so games are sampled with a fixed seed.
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import engine
+import helper
+import quordle_solver
+import simulator
+
+__author__ = "Z Feng"
+
+max_auto_attempts = 20
+
+
+def sample_answers(games: int, seed: int = 0) -> list:
+    """
+    Sample tuples of four different answers. The sample of a seed always starts with the same games, so that a run can
+    be extended by sampling more games.
+    :param games: number of games
+    :param seed: random seed
+    :return: list of tuples of four answers
+    """
+    potential_answers = engine.get_engine().similarity_lut.potential_answers
+    rng = np.random.default_rng(seed)
+    return [tuple(potential_answers[i] for i in rng.choice(len(potential_answers), 4, replace=False))
+            for game in range(games)]
+
+
+def play(game: tuple, joint: bool = False) -> dict:
+    """
+    Play a single game against the automatic Quordle solver and record it.
+    :param game: index of the game and tuple of the four answers
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
+    :return: record of the game with its index, answers, scoring, guesses, patterns of every board, the attempt solving
+    every board, attempts (None if unsolved) and wall time in seconds
+    """
+    t_start = time.time()
+    index, answers = game
+    lut = engine.get_engine().similarity_lut
+    guesses = []
+    patterns = []
+    solved_at = [None] * 4
+    attempts = None
+    gen = quordle_solver.auto_solver(joint)
+    guess = next(gen)
+    for attempt in range(max_auto_attempts):
+        similarities = tuple(helper.compare(guess, answer, lut=lut) for answer in answers)
+        guesses.append(guess)
+        patterns.append([helper.similarity_to_pattern(similarity, lut.word_length) for similarity in similarities])
+        for puzzle_num in range(4):
+            if solved_at[puzzle_num] is None and similarities[puzzle_num] == lut.solved_similarity:
+                solved_at[puzzle_num] = attempt + 1
+        if None not in solved_at:
+            attempts = attempt + 1
+            break
+        next(gen)
+        guess = gen.send(similarities)
+    return {'game': index, 'answers': list(answers), 'joint': joint, 'guesses': guesses, 'patterns': patterns,
+            'solved_at': solved_at, 'attempts': attempts, 'time': time.time() - t_start}
+
+
+def parallel_simulator(games: int = 1000, seed: int = 0, workers: int = None, output: str = 'quordle.jsonl',
+                       resume: bool = True, joint: bool = False) -> list:
+    """
+    Simulator that spreads sampled games over a process pool and streams one JSON line per game to the output file.
+    :param games: number of games
+    :param seed: random seed of the sampled answers
+    :param workers: number of worker processes. Default the number of CPUs.
+    :param output: path of the JSON lines file
+    :param resume: skip games already recorded in the output file, which must record games of the same scoring.
+    Otherwise the output file is overwritten.
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
+    :return: records of the sampled games in the output file
+    """
+    if not resume and os.path.exists(output):
+        os.remove(output)
+    sample = list(enumerate(sample_answers(games, seed)))
+    records = simulator.load_records(output)
+    mismatched = [record for record in records if record.get('joint') != joint]
+    if mismatched:
+        raise ValueError(f'{output} records {len(mismatched)} games of joint scoring {mismatched[0].get("joint")}, '
+                         f'not {joint}. Use another output file or do not resume.')
+    done = {(record['game'], tuple(record['answers'])) for record in records}
+    todo = [game for game in sample if game not in done]
+    print(f'{len(sample) - len(todo)} games recorded, {len(todo)} games to play with {workers or os.cpu_count()} '
+          f'workers')
+    with open(output, 'a') as f, multiprocessing.Pool(workers) as pool:
+        for i, record in enumerate(pool.imap_unordered(functools.partial(play, joint=joint), todo, chunksize=4)):
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            if (i + 1) % 100 == 0:
+                print(f'{i + 1}/{len(todo)}')
+    sample = set(sample)
+    return [record for record in simulator.load_records(output) if (record['game'], tuple(record['answers'])) in sample]
+
+
+def print_summary(records: list) -> None:
+    """
+    Print a histogram of the number of attempts of recorded games, and the rate of games lost in Quordle, i.e. not
+    solved within quordle_solver.max_attempts.
+    :param records: list of game records
+    :return: None
+    """
+    simulator.print_summary(records)
+    lost = sum(record['attempts'] is None or record['attempts'] > quordle_solver.max_attempts for record in records)
+    print(f'{lost / len(records):.2%} of games not solved within {quordle_solver.max_attempts} attempts')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=1000, help="number of sampled games")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the sampled answers")
+    parser.add_argument('--output', default='quordle.jsonl', help="stream JSON lines to this file")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--no-resume', action='store_true', help="overwrite the output instead of resuming")
+    parser.add_argument('--joint', action='store_true', help="score the boards as one puzzle by their joint entropy")
+    args = parser.parse_args()
+    t_start = time.time()
+    print_summary(parallel_simulator(args.games, args.seed, args.workers, args.output, not args.no_resume, args.joint))
+    print(f'Finished in {time.time() - t_start: .3f} seconds!')
+
+# EOF
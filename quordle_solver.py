@@ -3,12 +3,15 @@ Solver for a Quordle puzzle
 https://www.quordle.com/#/
 """
 
-import os
-import pickle
+import argparse
 import numpy as np
 
+import engine
 import helper
+import ranking
 import solver
+from candidates import CandidateSet
+from entropy_state import EntropyState
 
 __author__ = "Z Feng"
 
@@ -36,34 +39,87 @@ def accept_quordle_test_result():
     return splits[0], (splits[1], splits[2], splits[3], splits[4])
 
 
-def man_solver():
+def compute_board_probabilities(answer_id_sets: list) -> np.ndarray:
+    """
+    Compute the probability of every legal guess being the answer of each board.
+    :param answer_id_sets: answer IDs of the potential answers remaining on each board
+    :return: probabilities of shape (number of legal guesses, number of boards)
+    """
+    similarity_lut = engine.get_engine().similarity_lut
+    probabilities = np.zeros((len(similarity_lut.legal_guesses), len(answer_id_sets)))
+    for board, ids in enumerate(answer_id_sets):
+        guess_ids = similarity_lut.answer_guess_ids[ids]
+        probabilities[guess_ids[guess_ids >= 0], board] = 1 / len(ids)
+    return probabilities
+
+
+def compute_quordle_scores(potential_answers: list, solved_puzzles: list, joint: bool = False,
+                           entropy_states: list = None) -> tuple:
+    """
+    Score every legal guess against all unsolved boards at once.
+    In the default mode the score is the mean of solver.compute_score_1 over the unsolved boards. In joint mode the
+    boards are scored as one puzzle: the entropy is the joint entropy of the tuple of patterns, which for boards with
+    independent answers equals the sum of the entropies of the boards, and the probability is that of solving any board.
+    :param potential_answers: candidate set of every board
+    :param solved_puzzles: whether every board is solved
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
+    :param entropy_states: entropy state of every board kept across turns, updated incrementally. Default all boards
+    are computed from scratch in one batched pass.
+    :return: total entropies, total probabilities and scores of every legal guess
+    """
+    answer_id_sets = [candidates.ids for candidates, solved in zip(potential_answers, solved_puzzles) if not solved]
+    if entropy_states is None:
+        entropies = solver.compute_entropy_sets(answer_id_sets)
+    else:
+        entropies = np.stack([state.entropies(candidates) for candidates, state, solved
+                              in zip(potential_answers, entropy_states, solved_puzzles) if not solved], axis=1)
+    probabilities = compute_board_probabilities(answer_id_sets)
+    total_entropies = np.zeros(len(entropies))
+    total_probabilities = np.zeros(len(entropies))
+    scores = np.zeros(len(entropies))
+    for board in range(len(answer_id_sets)):
+        total_entropies += entropies[:, board]
+        total_probabilities += probabilities[:, board]
+        scores += solver.compute_score_1(entropies[:, board], probabilities[:, board])
+    if joint:
+        scores = solver.compute_score_1(total_entropies, 1 - np.prod(1 - probabilities, axis=1))
+    else:
+        scores /= len(answer_id_sets)
+    return total_entropies, total_probabilities, scores
+
+
+def initial_quordle_scores(joint: bool = False) -> tuple:
+    """
+    Scores of the first turn, when every board has all potential answers, cached by the engine.
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
+    :return: total entropies, total probabilities and scores of every legal guess
+    """
+    shared_engine = engine.get_engine()
+
+    def build() -> np.ndarray:
+        potential_answers = [CandidateSet.full(shared_engine.similarity_lut) for i in range(4)]
+        return np.stack(compute_quordle_scores(potential_answers, [False] * 4, joint))
+
+    return tuple(shared_engine.cache.load_or_build('quordle_initial_scores' + ('_joint' if joint else ''), build))
+
+
+def man_solver(joint: bool = False):
     """
     Manual solver of a Quordle puzzle
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
     """
-    legal_guesses = helper.get_guess_dictionary()
-    potential_answers = [helper.get_answer_dictionary() for i in range(4)]
+    shared_engine = engine.get_engine()
+    legal_guesses = shared_engine.similarity_lut.legal_guesses
+    print(shared_engine)
+    potential_answers = [CandidateSet.full(shared_engine.similarity_lut) for i in range(4)]
+    entropy_states = [EntropyState(shared_engine.similarity_lut) for i in range(4)]
     solved_puzzles = [False for i in range(4)]
     for attempt in range(max_attempts):
         if attempt == 0:
-            entropies = initial_entropies
-            probabilities = initial_probabilities
-            scores = solver.compute_score_1(entropies, probabilities)
-            total_entropies = entropies * 4
-            total_probabilities = probabilities * 4
+            total_entropies, total_probabilities, scores = initial_quordle_scores(joint)
         else:
-            total_entropies = np.zeros(len(legal_guesses))
-            total_probabilities = np.zeros(len(legal_guesses))
-            scores = np.zeros(len(legal_guesses))
-            for puzzle_num in range(4):
-                if not solved_puzzles[puzzle_num]:
-                    entropies = solver.compute_entropy(legal_guesses,
-                                                       potential_answers[puzzle_num], do_print=False)
-                    probabilities = solver.compute_probabilities(legal_guesses,
-                                                                  potential_answers[puzzle_num])
-                    total_entropies += entropies
-                    total_probabilities += probabilities
-                    scores += solver.compute_score_1(entropies, probabilities)
-            scores /= (4 - sum(solved_puzzles))
+            total_entropies, total_probabilities, scores = compute_quordle_scores(potential_answers, solved_puzzles,
+                                                                                  joint, entropy_states)
         solver.print_results(legal_guesses, total_entropies, total_probabilities, scores)
         typo = True  # in case user has a legal typo
         while typo:
@@ -72,11 +128,11 @@ def man_solver():
             for puzzle_num in range(4):
                 if not solved_puzzles[puzzle_num]:
                     similarity = helper.pattern_to_similarity(patterns[puzzle_num])
-                    if similarity == 3 ** 5 - 1:
+                    if similarity == shared_engine.similarity_lut.solved_similarity:
                         solved_puzzles[puzzle_num] = True
                     else:
                         potential_answers[puzzle_num] = solver.refine_potential_answers(
-                            guess, potential_answers[puzzle_num], similarity)
+                            guess, potential_answers[puzzle_num], similarity, entropy_states[puzzle_num])
                         if len(potential_answers[puzzle_num]) == 0:
                             typo = True
                             print('Impossible! Please try last input again!')
@@ -85,38 +141,41 @@ def man_solver():
             break
 
 
-# initialise similarity LUT
-if os.path.exists('similarity_lut.pkl'):
-    with open('similarity_lut.pkl', 'rb') as pkl_file:
-        similarity_lut = pickle.load(pkl_file)
-else:
-    print('Initialising similarity LUT...')
-    similarity_lut = helper.gen_similarity_LUT()
-    with open('similarity_lut.pkl', 'wb') as pkl_file:
-        pickle.dump(similarity_lut, pkl_file)
-# initial entropies
-if os.path.exists('initial_entropies.npy'):
-    print('loading initial_entropies.npy...')
-    with open('initial_entropies.npy', 'rb') as npy_file:
-        initial_entropies = np.load(npy_file)
-else:
-    initial_entropies = solver.compute_entropy()
-    print('saving initial_entropies.npy...')
-    with open('initial_entropies.npy', 'wb') as npy_file:
-        np.save(npy_file, initial_entropies)
-# initial probabilities
-if os.path.exists('initial_probabilities.npy'):
-    print('loading initial_probabilities.npy...')
-    with open('initial_probabilities.npy', 'rb') as npy_file:
-        initial_probabilities = np.load(npy_file)
-else:
-    initial_probabilities = solver.compute_probabilities()
-    print('saving initial_probabilities.npy...')
-    with open('initial_probabilities.npy', 'wb') as npy_file:
-        np.save(npy_file, initial_probabilities)
+def auto_solver(joint: bool = False):
+    """
+    Generator object that solves a Quordle puzzle automatically, guessing the word of best score every turn.
+    After every guess, the similarities of the four boards are sent as a tuple. Similarities of solved boards are
+    ignored.
+    :param joint: score the joint entropy and probability instead of the mean score of the boards
+    """
+    shared_engine = engine.get_engine()
+    legal_guesses = shared_engine.similarity_lut.legal_guesses
+    potential_answers = [CandidateSet.full(shared_engine.similarity_lut) for i in range(4)]
+    entropy_states = [EntropyState(shared_engine.similarity_lut) for i in range(4)]
+    solved_puzzles = [False for i in range(4)]
+    first_attempt = True
+    while True:
+        if first_attempt:
+            total_entropies, total_probabilities, scores = initial_quordle_scores(joint)
+            first_attempt = False
+        else:
+            total_entropies, total_probabilities, scores = compute_quordle_scores(potential_answers, solved_puzzles,
+                                                                                  joint, entropy_states)
+        guess_id = ranking.top_k(scores, 1)[0]
+        yield legal_guesses[guess_id]
+        similarities = yield
+        for puzzle_num in range(4):
+            if not solved_puzzles[puzzle_num]:
+                if similarities[puzzle_num] == shared_engine.similarity_lut.solved_similarity:
+                    solved_puzzles[puzzle_num] = True
+                else:
+                    potential_answers[puzzle_num] = entropy_states[puzzle_num].refine(
+                        potential_answers[puzzle_num], guess_id, similarities[puzzle_num])
 
 
 if __name__ == "__main__":
-    man_solver()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--joint', action='store_true', help="score the boards as one puzzle by their joint entropy")
+    man_solver(parser.parse_args().joint)
 
 # EOF
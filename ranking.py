@@ -0,0 +1,44 @@
+"""
+Top-K ranking of guesses by partial sorts.
+"""
+
+import numpy as np
+
+__author__ = "Z Feng"
+
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest values in descending order, found by a partial sort. Ties are broken by the lowest index
+    first, exactly like a stable sort in descending order, e.g. sorted(..., reverse=True).
+    :param values: values of every guess
+    :param k: number of indices returned, at most len(values)
+    :return: int array of indices
+    """
+    values = np.asarray(values)
+    n = len(values)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k == 1:
+        return np.array([np.argmax(values)], dtype=np.intp)
+    if k < n:
+        # every value above the k-th largest is kept, and of the values equal to it the lowest indices come first
+        threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+        candidates = np.flatnonzero(values >= threshold)
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-values[candidates], kind='stable')[:k]]
+
+
+def rank_guesses(entropies: np.ndarray, probabilities: np.ndarray, scores: np.ndarray, k: int) -> tuple:
+    """
+    :param entropies: entropy of every guess
+    :param probabilities: probability of every guess
+    :param scores: score of every guess
+    :param k: number of guesses ranked
+    :return: indices of the top k guesses by entropy, by probability and by score
+    """
+    return top_k(entropies, k), top_k(probabilities, k), top_k(scores, k)
+
+# EOF
@@ -0,0 +1,255 @@
+"""
+Local HTTP/JSON service of the Wordle solver. The pattern matrix is loaded once, game histories are posted to /suggest
+and ranked suggestions are returned. Entropy computations of requests arriving within a short window are combined into
+a single pass over the pattern matrix. Latency percentiles and throughput are served at /stats.
+
+POST /suggest {"guesses": ["soare"], "patterns": ["00120"], "strategy": "score 2", "hard_mode": false, "top": 5}
+GET /stats
+"""
+
+import argparse
+import collections
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+import engine
+import helper
+import ranking
+import solver
+from candidates import CandidateSet
+from hard_mode import HardModeFilter
+
+__author__ = "Z Feng"
+
+batch_window = 0.005  # seconds the batcher waits for more requests after the first one
+max_batch_size = 32  # candidate sets computed in one pass
+latency_window = 10000  # latest requests kept for the latency percentiles
+strategies = ('entropy first', 'score 1', 'score 2')
+
+
+class EntropyBatcher:
+    """
+    Thread computing the entropies of the candidate sets submitted by request threads. Sets submitted while a batch is
+    collected are computed together by solver.compute_entropy_sets, and identical sets are computed once.
+    """
+
+    def __init__(self, window: float = None, max_size: int = None):
+        """
+        :param window: seconds waited for more sets after the first one of a batch. Default batch_window.
+        :param max_size: maximal number of sets in a batch. Default max_batch_size.
+        """
+        self.window = batch_window if window is None else window
+        self.max_size = max_batch_size if max_size is None else max_size
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.sets = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, answer_ids: np.ndarray) -> np.ndarray:
+        """
+        Compute the entropies of every legal guess for a candidate set, blocking until its batch is done.
+        :param answer_ids: answer IDs of the candidates
+        :return: entropies of every legal guess
+        """
+        item = {'answer_ids': answer_ids, 'done': threading.Event(), 'entropies': None, 'error': None}
+        self.queue.put(item)
+        item['done'].wait()
+        if item['error'] is not None:
+            raise item['error']
+        return item['entropies']
+
+    def run(self) -> None:
+        while True:
+            items = [self.queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(items) < self.max_size:
+                try:
+                    items.append(self.queue.get(timeout=max(0., deadline - time.perf_counter())))
+                except queue.Empty:
+                    break
+            groups = {}
+            for item in items:
+                groups.setdefault(item['answer_ids'].tobytes(), []).append(item)
+            try:
+                entropies = solver.compute_entropy_sets([group[0]['answer_ids'] for group in groups.values()])
+                for column, group in enumerate(groups.values()):
+                    for item in group:
+                        item['entropies'] = entropies[:, column]
+            except Exception as error:
+                for item in items:
+                    item['error'] = error
+            self.batches += 1
+            self.sets += len(groups)
+            for item in items:
+                item['done'].set()
+
+
+class ServiceStats:
+    """
+    Request counters and latencies of the service, shared by the request threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.t_start = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.finished = collections.deque(maxlen=latency_window)  # finishing times of the latest requests
+
+    def record(self, latency: float, error: bool = False) -> None:
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.latencies.append(latency)
+            self.finished.append(time.perf_counter())
+
+    def snapshot(self, batcher: EntropyBatcher) -> dict:
+        """
+        :return: counters, p50/p99 latency in milliseconds of the latest requests and their throughput per second
+        """
+        with self.lock:
+            latencies = np.array(self.latencies)
+            finished = np.array(self.finished)
+            requests, errors = self.requests, self.errors
+        stats = {'requests': requests, 'errors': errors, 'uptime': time.perf_counter() - self.t_start,
+                 'batches': batcher.batches, 'sets_per_batch': batcher.sets / max(batcher.batches, 1)}
+        if len(latencies):
+            stats['p50_ms'] = float(np.percentile(latencies, 50) * 1e3)
+            stats['p99_ms'] = float(np.percentile(latencies, 99) * 1e3)
+        if len(finished) > 1 and finished[-1] > finished[0]:
+            stats['throughput'] = (len(finished) - 1) / (finished[-1] - finished[0])
+        return stats
+
+
+def suggest(request: dict, batcher: EntropyBatcher) -> dict:
+    """
+    Rank the guesses after a game history.
+    :param request: guesses and patterns of the history, and optionally strategy, hard_mode and top
+    :param batcher: batcher computing the entropies
+    :return: number of candidates, a few of them, and the best suggestions with entropy, probability and score
+    """
+    shared_engine = engine.get_engine()
+    similarity_lut = shared_engine.similarity_lut
+    guesses = request.get('guesses', [])
+    patterns = request.get('patterns', [])
+    strategy = request.get('strategy', 'score 2')
+    top = int(request.get('top', 5))
+    if len(guesses) != len(patterns):
+        raise ValueError('guesses and patterns differ in length')
+    if strategy not in strategies:
+        raise ValueError(f'strategy must be one of {", ".join(strategies)}')
+    potential_answers = CandidateSet.full(similarity_lut)
+    hard_mode_filter = HardModeFilter(shared_engine.hard_mode_index) if request.get('hard_mode') else None
+    for guess, pattern in zip(guesses, patterns):
+        if guess not in similarity_lut.guess_ids:
+            raise ValueError(f'{guess} is not a legal guess')
+        if len(pattern) != len(guess) or any(digit not in '012' for digit in pattern):
+            raise ValueError(f'{pattern} is not a pattern')
+        similarity = helper.pattern_to_similarity(pattern)
+        potential_answers = potential_answers.refine(guess, similarity)
+        if hard_mode_filter is not None:
+            hard_mode_filter.update(guess, similarity)
+    if len(potential_answers) == 0:
+        raise ValueError('no potential answer is consistent with the history')
+    if guesses:
+        entropies = batcher.submit(potential_answers.ids)
+        probabilities = solver.compute_probabilities(similarity_lut.legal_guesses, potential_answers)
+    else:
+        entropies = shared_engine.initial_entropies
+        probabilities = shared_engine.initial_probabilities
+    if hard_mode_filter is not None:
+        entropies = np.where(hard_mode_filter.allowed, entropies, -np.inf)
+    if strategy == 'entropy first':
+        scores = entropies
+    elif strategy == 'score 1':
+        scores = solver.compute_score_1(entropies, probabilities)
+    else:
+        scores = solver.compute_score_2(entropies, probabilities)
+    # guesses not allowed in hard mode have score -inf, and are never suggested
+    allowed = np.flatnonzero(np.isfinite(scores))
+    ranked = allowed[ranking.top_k(scores[allowed], top)]
+    if strategy == 'entropy first' and len(potential_answers) == 1:
+        # every entropy is 0, so the last candidate is suggested first, as solver.next_guess guesses it
+        answer_guess_id = similarity_lut.answer_guess_ids[potential_answers.ids[0]]
+        ranked = np.concatenate(([answer_guess_id], ranked[ranked != answer_guess_id]))[:top]
+    return {'candidates': len(potential_answers), 'sample': potential_answers.words()[:10],
+            'suggestions': [{'word': similarity_lut.legal_guesses[i], 'entropy': float(entropies[i]),
+                             'probability': float(probabilities[i]), 'score': float(scores[i])} for i in ranked]}
+
+
+class SolverHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the requests of the service. The batcher and the stats are attributes of the server.
+    """
+
+    def send_json(self, status: int, content: dict) -> None:
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == '/stats':
+            self.send_json(200, self.server.stats.snapshot(self.server.batcher))
+        else:
+            self.send_json(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self) -> None:
+        if self.path != '/suggest':
+            self.send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        t_start = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            status, response = 200, suggest(request, self.server.batcher)
+        except (ValueError, TypeError, AttributeError) as error:
+            status, response = 400, {'error': str(error)}
+        except Exception as error:
+            status, response = 500, {'error': repr(error)}
+        self.send_json(status, response)
+        self.server.stats.record(time.perf_counter() - t_start, error=status != 200)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # one line per request would dominate the output under load
+
+
+def serve(host: str = '127.0.0.1', port: int = 8000, window: float = None, max_size: int = None) -> None:
+    """
+    Load the engine and serve until interrupted.
+    :param host: address to bind
+    :param port: port to bind
+    :param window: seconds the batcher waits for more requests. Default batch_window.
+    :param max_size: maximal number of candidate sets in a batch. Default max_batch_size.
+    """
+    print(engine.get_engine())
+    engine.get_engine().hard_mode_index  # build before the first request rather than during it
+    server = ThreadingHTTPServer((host, port), SolverHandler)
+    server.batcher = EntropyBatcher(window, max_size)
+    server.stats = ServiceStats()
+    print(f'Serving on http://{host}:{port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats.snapshot(server.batcher), indent=2))
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help="address to bind")
+    parser.add_argument('--port', type=int, default=8000, help="port to bind")
+    parser.add_argument('--batch-window', type=float, default=batch_window * 1e3,
+                        help="milliseconds waited for more requests to batch")
+    parser.add_argument('--max-batch', type=int, default=max_batch_size, help="maximal candidate sets per batch")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.batch_window / 1e3, args.max_batch)
+
+# EOF
@@ -2,9 +2,15 @@
 Simulator for testing the solver of Wordle puzzles.
 """
 
+import argparse
+import functools
+import json
+import multiprocessing
+import os
 import time
 import numpy as np
 
+import engine
 import helper
 import solver
 
@@ -13,37 +19,42 @@ __author__ = "Z Feng"
 max_auto_attempts = 10
 
 
-def simulator() -> float:
+def simulator(strategy: str = 'score 2', hard_mode: bool = False) -> float:
     """
     Simulator that goes through every possible Wordle puzzle in the dictionary, and compute the mean.
+    :param strategy: strategy of the automatic solver
+    :param hard_mode: play in hard mode
     :return: mean number of attempts by the solver.
     """
     attempts = []
-    potential_answers = helper.get_answer_dictionary()
+    potential_answers = engine.get_engine().similarity_lut.potential_answers
     for i, answer in enumerate(potential_answers):
         print(f'\n{i + 1}/{len(potential_answers)}')
-        attempt = responder(answer, do_print=True)
+        attempt = responder(answer, do_print=True, strategy=strategy, hard_mode=hard_mode)
         attempts.append(attempt)
+    print(f'\n{solver.decision_cache}')
     return float(np.mean(attempts))
 
 
-def responder(answer: str, do_print: bool = False) -> int:
+def responder(answer: str, do_print: bool = False, strategy: str = 'score 2', hard_mode: bool = False) -> int:
     """
     Respond to the solver to simulate the puzzle.
     :param answer: Right answer
     :param do_print: print progress or not
+    :param strategy: strategy of the automatic solver
+    :param hard_mode: play in hard mode
     :return: number of attempts used
     """
     if do_print:
         print(f'Simulation starts! Answer = {answer}')
         print('attempt\tguess\tpattern')
-    gen = solver.auto_solver(strategy='score 2')
+    gen = solver.auto_solver(strategy=strategy, hard_mode=hard_mode)
     guess = next(gen)
     for attempt in range(max_auto_attempts):
         if guess != answer:
             similarity = helper.compare(guess, answer)
             if do_print:
-                pattern = helper.similarity_to_pattern(similarity)
+                pattern = helper.similarity_to_pattern(similarity, len(answer))
                 print(f'{attempt + 1}\t\t{guess}\t{pattern}')
         else:
             if do_print:
@@ -53,10 +64,209 @@ def responder(answer: str, do_print: bool = False) -> int:
         guess = gen.send(similarity)
 
 
+def play(answer: str, strategy: str = 'score 2', hard_mode: bool = False) -> dict:
+    """
+    Play a single game against the automatic solver and record it.
+    :param answer: Right answer
+    :param strategy: strategy of the automatic solver
+    :param hard_mode: play in hard mode
+    :return: record of the game with answer, strategy, hard mode, guesses, patterns, attempts (None if unsolved) and
+    wall time in seconds
+    """
+    t_start = time.time()
+    guesses = []
+    patterns = []
+    attempts = None
+    gen = solver.auto_solver(strategy=strategy, hard_mode=hard_mode)
+    guess = next(gen)
+    for attempt in range(max_auto_attempts):
+        similarity = helper.compare(guess, answer, lut=engine.get_engine().similarity_lut)
+        guesses.append(guess)
+        patterns.append(helper.similarity_to_pattern(similarity, len(answer)))
+        if guess == answer:
+            attempts = attempt + 1
+            break
+        next(gen)
+        guess = gen.send(similarity)
+    return {'answer': answer, 'strategy': strategy, 'hard_mode': hard_mode, 'guesses': guesses, 'patterns': patterns,
+            'attempts': attempts, 'time': time.time() - t_start}
+
+
+def init_worker(decision_cache_file: str = None) -> None:
+    """
+    Initialise a worker process of the parallel simulator.
+    :param decision_cache_file: JSON file of decisions saved by a previous run
+    """
+    if decision_cache_file is not None:
+        solver.decision_cache.load(decision_cache_file)
+    solver.decision_cache.drain()
+
+
+def play_in_worker(answer: str, strategy: str = 'score 2', hard_mode: bool = False) -> tuple:
+    """
+    Play a single game in a worker process of the parallel simulator.
+    :return: record of the game, decisions added to the cache of the worker, cache hits and cache misses
+    """
+    hits, misses = solver.decision_cache.hits, solver.decision_cache.misses
+    record = play(answer, strategy, hard_mode)
+    return (record, solver.decision_cache.drain(),
+            solver.decision_cache.hits - hits, solver.decision_cache.misses - misses)
+
+
+def load_records(output: str) -> list:
+    """
+    Load the game records streamed to a JSON lines file. A partially written last line is ignored.
+    :param output: path of the JSON lines file
+    :return: list of records
+    """
+    records = []
+    if os.path.exists(output):
+        with open(output, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+    return records
+
+
+def parallel_simulator(answers: list = None, strategy: str = 'score 2', workers: int = None,
+                       output: str = 'simulation.jsonl', resume: bool = True, decision_cache_file: str = None,
+                       hard_mode: bool = False) -> list:
+    """
+    Simulator that spreads the games over a process pool and streams one JSON line per game to the output file.
+    Workers read the memory-mapped pattern matrix of the solver, so all of them share one copy through the page cache.
+    :param answers: answers to simulate. Default every answer in the dictionary.
+    :param strategy: strategy of the automatic solver
+    :param workers: number of worker processes. Default the number of CPUs.
+    :param output: path of the JSON lines file
+    :param resume: skip answers already recorded in the output file, which must record games of the same strategy and
+    mode. Otherwise the output file is overwritten.
+    :param decision_cache_file: JSON file of solver decisions, loaded by the workers and saved with the new decisions
+    :param hard_mode: play in hard mode
+    :return: records of every game in the output file
+    """
+    if answers is None:
+        answers = engine.get_engine().similarity_lut.potential_answers
+    if not resume and os.path.exists(output):
+        os.remove(output)
+    records = load_records(output)
+    mismatched = [record for record in records
+                  if record.get('strategy') != strategy or record.get('hard_mode') != hard_mode]
+    if mismatched:
+        raise ValueError(f'{output} records {len(mismatched)} games of strategy {mismatched[0].get("strategy")!r} and '
+                         f'hard mode {mismatched[0].get("hard_mode")}, not {strategy!r} and {hard_mode}. '
+                         f'Use another output file or do not resume.')
+    done = {record['answer'] for record in records}
+    todo = [answer for answer in answers if answer not in done]
+    print(f'{len(done)} games recorded, {len(todo)} games to play with {workers or os.cpu_count()} workers')
+    cache = solver.decision_cache
+    if decision_cache_file is not None:
+        cache.load(decision_cache_file)
+    with open(output, 'a') as f, multiprocessing.Pool(workers, init_worker, (decision_cache_file,)) as pool:
+        results = pool.imap_unordered(functools.partial(play_in_worker, strategy=strategy, hard_mode=hard_mode), todo,
+                                      chunksize=4)
+        for i, (record, decisions, hits, misses) in enumerate(results):
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            cache.update(decisions)
+            cache.hits += hits
+            cache.misses += misses
+            if (i + 1) % 100 == 0:
+                print(f'{i + 1}/{len(todo)}')
+    print(cache)
+    if decision_cache_file is not None:
+        cache.save(decision_cache_file)
+    answers = set(answers)
+    return [record for record in load_records(output) if record['answer'] in answers]
+
+
+def print_summary(records: list) -> None:
+    """
+    Print a histogram of the number of attempts of recorded games.
+    :param records: list of game records
+    :return: None
+    """
+    attempts = [record['attempts'] for record in records if record['attempts'] is not None]
+    failures = len(records) - len(attempts)
+    print('attempts\tgames')
+    for attempt, count in zip(*np.unique(attempts, return_counts=True)):
+        print(f'{attempt}\t\t\t{count}\t{"#" * int(np.ceil(60 * count / len(records)))}')
+    if failures:
+        print(f'failed\t\t{failures}')
+    if attempts:
+        print(f'\nSolver finishes in {np.mean(attempts): .3f} attempts on average!')
+    print(f'{sum(record["time"] for record in records): .3f} seconds of game time over {len(records)} games')
+
+
+def record_file(prefix: str, strategy: str, hard_mode: bool = False) -> str:
+    """
+    :param prefix: prefix of the JSON lines files
+    :param strategy: strategy of the automatic solver
+    :param hard_mode: play in hard mode
+    :return: path of the JSON lines file recording the games of a strategy
+    """
+    return f'{prefix}_{strategy.replace(" ", "_")}{"_hard" if hard_mode else ""}.jsonl'
+
+
+def compare_strategies(strategies: list, answers: list = None, workers: int = None, output: str = 'simulation',
+                       resume: bool = True, hard_mode: bool = False) -> None:
+    """
+    Simulate several strategies over the same answers and print their accuracy and cost side by side.
+    :param strategies: strategies of the automatic solver
+    :param answers: answers to simulate. Default every answer in the dictionary.
+    :param workers: number of worker processes. Default the number of CPUs.
+    :param output: prefix of the JSON lines files, one per strategy
+    :param resume: skip answers already recorded in the output files
+    :param hard_mode: play in hard mode
+    :return: None
+    """
+    rows = []
+    for strategy in strategies:
+        records = parallel_simulator(answers, strategy, workers, record_file(output, strategy, hard_mode), resume,
+                                     hard_mode=hard_mode)
+        attempts = [record['attempts'] for record in records if record['attempts'] is not None]
+        times = [record['time'] for record in records]
+        rows.append((strategy, len(records), np.mean(attempts), len(records) - len(attempts),
+                     1e3 * np.mean(times), 1e3 * np.max(times)))
+    print(f'\n{"strategy":<16}{"games":>8}{"mean":>10}{"failed":>8}{"ms/game":>10}{"max ms":>10}')
+    for strategy, games, mean, failures, mean_time, max_time in rows:
+        print(f'{strategy:<16}{games:>8}{mean:>10.3f}{failures:>8}{mean_time:>10.1f}{max_time:>10.1f}')
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--strategy', default='score 2', help="strategy of the automatic solver")
+    parser.add_argument('--output', help="stream JSON lines to this file from a process pool")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--answers', help="file of answers, or comma separated answers. Default every answer")
+    parser.add_argument('--no-resume', action='store_true', help="overwrite the output instead of resuming")
+    parser.add_argument('--decision-cache', help="JSON file persisting the decisions of the solver across runs")
+    parser.add_argument('--compare', help="comma separated strategies to compare. --output is used as file prefix")
+    parser.add_argument('--hard', action='store_true', help="hard mode: every guess must be consistent with all hints")
+    args = parser.parse_args()
     t_start = time.time()
-    mean = simulator()
-    print(f'\nSolver finishes in {mean: .3f} attempts on average!')
+    if args.output is None:
+        if args.decision_cache is not None:
+            solver.decision_cache.load(args.decision_cache)
+        mean = simulator(args.strategy, args.hard)
+        if args.decision_cache is not None:
+            solver.decision_cache.save(args.decision_cache)
+        print(f'\nSolver finishes in {mean: .3f} attempts on average!')
+    else:
+        if args.answers is None:
+            answers = None
+        elif os.path.exists(args.answers):
+            with open(args.answers, 'r') as f:
+                answers = f.read().split()
+        else:
+            answers = args.answers.split(',')
+        if args.compare is not None:
+            compare_strategies(args.compare.split(','), answers, args.workers, args.output, not args.no_resume,
+                               args.hard)
+        else:
+            print_summary(parallel_simulator(answers, args.strategy, args.workers, args.output, not args.no_resume,
+                                             args.decision_cache, args.hard))
     print(f'Finished in {time.time() - t_start: .3f} seconds!')
 
 # EOF
@@ -2,31 +2,136 @@
 Solver for a Wordle puzzle.
 """
 
-import os
-import pickle
-import warnings
+import argparse
+import time
 import numpy as np
 
+import engine
 import helper
+import memo
+import ranking
+from candidates import CandidateSet
+from entropy_state import EntropyState, count_patterns, entropy_table
+from guess_index import GuessIndex
+from hard_mode import HardModeFilter
 
 __author__ = "Z Feng"
 
 max_attempts = 5
-warnings.filterwarnings('ignore')
+entropy_chunk_size = 1024  # rows of the pattern matrix counted at once by compute_entropy
+decision_cache = memo.DecisionCache()  # decisions of auto_solver shared by every game in this process
+lookahead_top_k = 60  # guesses with most entropy fully evaluated by the 'lookahead 2' strategy
+lookahead_time_budget = 2.  # seconds per turn of the 'lookahead 2' strategy
+lookahead_bits_per_guess = 4.  # information gained per guess assumed beyond the lookahead horizon
 
 
-def compute_entropy(legal_guesses: list = None, potential_answers: list = None, do_print: bool = True) -> np.ndarray:
+def compute_entropy_batch(answer_ids: np.ndarray, guess_ids: np.ndarray = None, pattern_matrix: np.ndarray = None,
+                          chunk_size: int = None, n_patterns: int = None) -> np.ndarray:
+    """
+    Compute the information entropy (in bits) of every guess in one pass over the pattern matrix. The patterns of every
+    chunk of rows are counted by a single bincount, see entropy_state.count_patterns.
+    :param answer_ids: answer IDs (columns of the pattern matrix) of the potential answers remaining
+    :param guess_ids: guess IDs (rows of the pattern matrix) to evaluate. Default all guesses.
+    :param pattern_matrix: pattern matrix. Default the one of the similarity LUT.
+    :param chunk_size: number of rows counted at once to bound peak memory. Default all rows in a single chunk.
+    :param n_patterns: number of patterns 3^N of words of length N. Default the one of the similarity LUT.
+    :return: array of information entropies for each guess. Entropy given in bits.
+    """
+    if pattern_matrix is None:
+        pattern_matrix = engine.get_engine().similarity_lut.matrix
+    if n_patterns is None:
+        n_patterns = engine.get_engine().similarity_lut.n_patterns
+    if guess_ids is not None:
+        pattern_matrix = pattern_matrix[guess_ids]
+    n_guesses = pattern_matrix.shape[0]
+    if chunk_size is None:
+        chunk_size = n_guesses
+    answer_ids = np.asarray(answer_ids, dtype=np.intp)
+    # a pattern seen c times contributes -p * log2(p) with p = c / n, so tabulate it once for every count
+    entropy_contributions = entropy_table(len(answer_ids))
+    entropies = np.empty(n_guesses, dtype=float)
+    for start in range(0, n_guesses, chunk_size):
+        # np.take keeps the chunk C-contiguous, unlike fancy indexing, so that counting does not copy it again
+        similarity_counts = count_patterns(np.take(pattern_matrix[start:start + chunk_size], answer_ids, axis=1),
+                                           n_patterns)
+        entropies[start:start + len(similarity_counts)] = np.sum(entropy_contributions[similarity_counts], axis=1)
+    return entropies
+
+
+def compute_entropy_sets(answer_id_sets: list, chunk_size: int = None) -> np.ndarray:
+    """
+    Compute the information entropy (in bits) of every legal guess for several sets of potential answers, e.g. the
+    boards of a Quordle puzzle or the games of concurrent requests, in one pass over the pattern matrix. The columns of
+    every set are gathered together, and the patterns are only counted for the rows that split a set: a row constant
+    over a set has entropy 0, which is the most common case for small sets.
+    :param answer_id_sets: answer IDs of the potential answers of each set
+    :param chunk_size: number of rows gathered at once to bound peak memory. Default entropy_chunk_size.
+    :return: entropies of shape (number of legal guesses, number of sets)
+    """
+    if chunk_size is None:
+        chunk_size = entropy_chunk_size
+    pattern_matrix = engine.get_engine().similarity_lut.matrix
+    n_patterns = engine.get_engine().similarity_lut.n_patterns
+    columns = np.concatenate(answer_id_sets).astype(np.intp)
+    bounds = np.cumsum([0] + [len(ids) for ids in answer_id_sets])
+    # -p * log2(p) tabulated for every count of every set, with p = count / (answers of the set)
+    tables = [entropy_table(len(ids)) for ids in answer_id_sets]
+    n_guesses = pattern_matrix.shape[0]
+    entropies = np.zeros((n_guesses, len(answer_id_sets)), dtype=float)
+    for start in range(0, n_guesses, chunk_size):
+        codes = np.take(pattern_matrix[start:start + chunk_size], columns, axis=1)
+        for i, table in enumerate(tables):
+            block = codes[:, bounds[i]:bounds[i + 1]]
+            splitting = np.flatnonzero(np.any(block != block[:, :1], axis=1))
+            if len(splitting) == 0:
+                continue
+            similarity_counts = count_patterns(block[splitting], n_patterns)
+            entropies[start + splitting, i] = np.sum(table[similarity_counts], axis=1)
+    return entropies
+
+
+def answer_indices(potential_answers) -> np.ndarray:
+    """
+    Answer IDs of potential answers given as a candidate set or a list of words.
+    :param potential_answers: candidate set or list of potential answers
+    :return: int array of answer IDs, or None if any answer is not in the similarity LUT
+    """
+    if isinstance(potential_answers, CandidateSet):
+        return potential_answers.ids
+    return engine.get_engine().similarity_lut.answer_indices(potential_answers)
+
+
+def compute_entropy(legal_guesses: list = None, potential_answers=None, do_print: bool = True,
+                    guess_index: GuessIndex = None) -> np.ndarray:
     """
     Compute the information entropy (in bits) of every legal guess in the legal_guesses list. Potential answers are
     given in a separate list with equal probability assumed.
-    :param legal_guesses: list of legal guesses
-    :param potential_answers: list of potential answers remaining
+    :param legal_guesses: list of legal guesses. Default the legal guesses of the engine.
+    :param potential_answers: candidate set or list of potential answers remaining. Default the potential answers of
+    the engine.
+    :param guess_index: reduction index kept by the caller across turns. If given, and potential_answers is a candidate
+    set and legal_guesses are all guesses of the similarity LUT, only the representatives of the index are evaluated.
+    If it is an entropy state, their pattern counts are also updated incrementally from the previous turn.
     :return: list of information entropies for each entry in legal_guesses. Entropy given in bits.
     """
+    similarity_lut = engine.get_engine().similarity_lut
     if legal_guesses is None:
-        legal_guesses = helper.get_guess_dictionary()
+        legal_guesses = similarity_lut.legal_guesses
     if potential_answers is None:
-        potential_answers = helper.get_answer_dictionary()
+        potential_answers = similarity_lut.potential_answers
+    if (guess_index is not None and isinstance(potential_answers, CandidateSet)
+            and legal_guesses == similarity_lut.legal_guesses):
+        if isinstance(guess_index, EntropyState):
+            return guess_index.entropies(potential_answers)
+        guess_index.update(potential_answers)
+        return guess_index.expand(compute_entropy_batch(np.arange(len(potential_answers)),
+                                                        pattern_matrix=guess_index.rows, chunk_size=entropy_chunk_size))
+    guess_ids = similarity_lut.guess_indices(legal_guesses)
+    answer_ids = answer_indices(potential_answers)
+    if guess_ids is not None and answer_ids is not None:
+        if np.array_equal(guess_ids, np.arange(len(similarity_lut.legal_guesses))):
+            guess_ids = None
+        return compute_entropy_batch(answer_ids, guess_ids, chunk_size=entropy_chunk_size)
     progress = 0
     entropies = []
     for guess in legal_guesses:
@@ -34,32 +139,40 @@ def compute_entropy(legal_guesses: list = None, potential_answers: list = None,
         if do_print:
             if progress % 500 == 0:
                 print(f'{progress}/{len(legal_guesses)}: {guess}')
-        similarity_counts = np.zeros(3 ** 5, dtype=float)
+        similarity_counts = np.zeros(3 ** len(guess), dtype=float)
         for target in potential_answers:
             similarity = helper.compare(guess, target, lut=similarity_lut)
             similarity_counts[similarity] += 1
         p = similarity_counts / len(potential_answers)
-        entropy_contributions = - p * np.log2(p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropy_contributions = - p * np.log2(p)
         entropy_contributions[np.isnan(entropy_contributions)] = 0
         entropy = np.sum(entropy_contributions)
         entropies.append(entropy)
     return np.array(entropies)
 
 
-def compute_probabilities(legal_guesses: list = None, potential_answers: list = None) -> np.ndarray:
+def compute_probabilities(legal_guesses: list = None, potential_answers=None) -> np.ndarray:
     """
     Compute the possibility of every legal guess in the legal_guesses list. Potential answers are given in a separate
     list with equal probabilities assumed.
-    :param legal_guesses: list of legal guesses
-    :param potential_answers: list of potential answers
+    :param legal_guesses: list of legal guesses. Default the legal guesses of the engine.
+    :param potential_answers: candidate set or list of potential answers. Default the potential answers of the engine.
     :return: list of probabilities for each entry in legal_guesses.
     """
+    similarity_lut = engine.get_engine().similarity_lut
     if legal_guesses is None:
-        legal_guesses = helper.get_guess_dictionary()
+        legal_guesses = similarity_lut.legal_guesses
     if potential_answers is None:
-        potential_answers = helper.get_answer_dictionary()
+        potential_answers = similarity_lut.potential_answers
     p = 1 / len(potential_answers)
-    probabilities = [(word in potential_answers) * p for word in legal_guesses]
+    if isinstance(potential_answers, CandidateSet) and legal_guesses == similarity_lut.legal_guesses:
+        guess_ids = similarity_lut.answer_guess_ids[potential_answers.ids]
+        probabilities = np.zeros(len(legal_guesses))
+        probabilities[guess_ids[guess_ids >= 0]] = p
+        return probabilities
+    answers = set(potential_answers)
+    probabilities = [(word in answers) * p for word in legal_guesses]
     return np.array(probabilities)
 
 
@@ -89,38 +202,151 @@ def compute_score_2(entropies: np.ndarray, probabilities: np.ndarray) -> np.ndar
     return scores
 
 
+def compute_score(entropies: np.ndarray, probabilities: np.ndarray, a: float, b: float) -> np.ndarray:
+    """
+    Parametrised score of compute_score_1 (a = 1, b = 1.1) and compute_score_2 (a = 0.1, b = 1.1).
+    The function of score is: S = (H + a * p) / (b ^ 2 - p ^ 2)
+    :param entropies: entropy (H)
+    :param probabilities: probability (p)
+    :param a: weight of the probability
+    :param b: pole of the score, more than 1
+    :return: score (S)
+    """
+    scores = (entropies + a * probabilities) / (b ** 2 - probabilities ** 2)
+    return scores
+
+
+def estimate_remaining_guesses(sizes: np.ndarray) -> np.ndarray:
+    """
+    Heuristic number of guesses still needed to solve a puzzle with a given number of potential answers remaining, used
+    beyond the horizon of the lookahead. 1 answer needs 1 guess, 2 answers need 1.5 guesses on average, and more
+    answers need one guess per lookahead_bits_per_guess bits of entropy on top.
+    :param sizes: numbers of potential answers remaining
+    :return: expected numbers of guesses, 0 for empty sets
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    with np.errstate(divide='ignore'):
+        estimates = 1 + np.log2(sizes) / lookahead_bits_per_guess
+    estimates[sizes == 2] = 1.5
+    estimates[sizes == 1] = 1
+    estimates[sizes == 0] = 0
+    return estimates
+
+
+def expected_guesses_one_step(guess_ids: np.ndarray, answer_ids: np.ndarray) -> np.ndarray:
+    """
+    Expected number of guesses to solve the puzzle for each guess, looking one step ahead: the guess itself plus the
+    estimated guesses still needed for every pattern other than the solved one.
+    :param guess_ids: guess IDs to evaluate
+    :param answer_ids: answer IDs of the potential answers remaining
+    :return: expected numbers of guesses
+    """
+    similarity_lut = engine.get_engine().similarity_lut
+    similarity_counts = count_patterns(np.take(similarity_lut.matrix[guess_ids], answer_ids, axis=1),
+                                       similarity_lut.n_patterns)
+    estimates = estimate_remaining_guesses(np.arange(len(answer_ids) + 1))
+    unsolved_counts = similarity_counts[:, :similarity_lut.solved_similarity]
+    remaining = unsolved_counts * estimates[unsolved_counts]
+    return 1 + remaining.sum(axis=1) / len(answer_ids)
+
+
+def lookahead_guess(legal_guesses: list, potential_answers, entropies: np.ndarray, top_k: int = None,
+                    time_budget: float = None, hard_mode: bool = False) -> int:
+    """
+    Choose the guess minimising the expected number of guesses, looking two steps ahead. Only the top_k guesses by
+    one-step entropy are fully evaluated: every pattern they can receive partitions the potential answers, and the best
+    second guess of each partition is chosen among the same top guesses and the answers of the partition. Partitions
+    shared by several top guesses are evaluated once.
+    :param legal_guesses: list of legal guesses, in the order of the similarity LUT
+    :param potential_answers: candidate set or list of potential answers remaining
+    :param entropies: one-step entropies of the legal guesses
+    :param top_k: number of guesses fully evaluated. Default lookahead_top_k.
+    :param time_budget: seconds after which no further guess is evaluated. Default lookahead_time_budget.
+    :param hard_mode: guesses not allowed have entropy -inf, and second guesses are chosen among the answers of the
+    partition only, as those are the guesses consistent with every hint
+    :return: guess ID of the guess
+    """
+    if top_k is None:
+        top_k = lookahead_top_k
+    if time_budget is None:
+        time_budget = lookahead_time_budget
+    t_start = time.perf_counter()
+    similarity_lut = engine.get_engine().similarity_lut
+    answer_ids = answer_indices(potential_answers)
+    if len(answer_ids) <= 2:
+        return int(similarity_lut.answer_guess_ids[answer_ids[0]])
+    top_guess_ids = ranking.top_k(entropies, top_k)
+    top_guess_ids = top_guess_ids[np.isfinite(entropies[top_guess_ids])]
+    partition_costs = {}
+    best_guess_id, best_cost = top_guess_ids[0], np.inf
+    for guess_id in top_guess_ids:
+        if time.perf_counter() - t_start > time_budget and np.isfinite(best_cost):
+            break
+        similarities = similarity_lut.matrix[guess_id, answer_ids]
+        order = np.argsort(similarities, kind='stable')
+        sorted_similarities = similarities[order]
+        boundaries = np.flatnonzero(np.diff(sorted_similarities)) + 1
+        cost = 1.
+        for start, partition in zip(np.concatenate(([0], boundaries)), np.split(answer_ids[order], boundaries)):
+            if sorted_similarities[start] == similarity_lut.solved_similarity:
+                continue  # solved by this guess
+            key = partition.tobytes()
+            if key not in partition_costs:
+                if len(partition) <= 2:
+                    partition_costs[key] = float(estimate_remaining_guesses([len(partition)])[0])
+                else:
+                    candidate_ids = similarity_lut.answer_guess_ids[partition]
+                    if not hard_mode:
+                        candidate_ids = np.union1d(top_guess_ids, candidate_ids)
+                    candidate_ids = candidate_ids[candidate_ids >= 0]
+                    partition_costs[key] = float(np.min(expected_guesses_one_step(candidate_ids, partition)))
+            cost += len(partition) / len(answer_ids) * partition_costs[key]
+        if cost < best_cost:
+            best_guess_id, best_cost = guess_id, cost
+    return int(best_guess_id)
+
+
 def print_results(legal_guesses: list, entropies: np.ndarray, probabilities: np.ndarray,
                   scores: np.ndarray, lines: int = 5) -> None:
     """
-    Print best guesses according to entropies.
+    Print best guesses according to entropies, probabilities and scores.
     :param legal_guesses: list of legal words that can be guessed.
     :param entropies: list of entropies (in bits) for every legal guess
+    :param probabilities: list of probabilities for every legal guess
+    :param scores: list of scores for every legal guess
     :param lines: number of lines printed
     :return: None
     """
-    guesses = [(legal_guesses[i], entropies[i], probabilities[i], scores[i]) for i in range(len(legal_guesses))]
-    # sort by entropy
-    guesses_by_entropy = sorted(guesses, key=lambda e: e[1], reverse=True)
-    # sort by probability
-    guesses_by_probability = sorted(guesses, key=lambda e: e[2], reverse=True)
-    # sort by score
-    guesses_by_score = sorted(guesses, key=lambda e: e[3], reverse=True)
-    # print
+    by_entropy, by_probability, by_score = ranking.rank_guesses(entropies, probabilities, scores, lines)
     print('word\tentropy (bits)\tword\tprobability\t\tword\tscore')
-    for i in range(lines):
-        print(f'{guesses_by_entropy[i][0]}\t{guesses_by_entropy[i][1]:.3f}'
-              + f'\t\t\t{guesses_by_probability[i][0]}\t{guesses_by_probability[i][2]:.3e}'
-              + f'\t\t{guesses_by_score[i][0]}\t{guesses_by_score[i][3]:3e}')
+    for i, j, k in zip(by_entropy, by_probability, by_score):
+        print(f'{legal_guesses[i]}\t{entropies[i]:.3f}'
+              + f'\t\t\t{legal_guesses[j]}\t{probabilities[j]:.3e}'
+              + f'\t\t{legal_guesses[k]}\t{scores[k]:3e}')
 
 
-def refine_potential_answers(guess: str, potential_answers: list, similarity: int) -> list:
+def refine_potential_answers(guess: str, potential_answers, similarity: int, entropy_state: EntropyState = None):
     """
     Refine potential answers from the result of a particular guess.
     :param guess: guessed word
-    :param potential_answers: potential answers to refine from
+    :param potential_answers: candidate set or list of potential answers to refine from
     :param similarity: similarity between guess and true answer
-    :return: list of refined potential answers
+    :param entropy_state: entropy state kept by the caller across turns, whose restricted pattern rows are reused
+    :return: refined candidate set, or list of refined potential answers if a list is given
     """
+    similarity_lut = engine.get_engine().similarity_lut
+    if isinstance(potential_answers, CandidateSet):
+        if guess in similarity_lut.guess_ids:
+            if entropy_state is not None:
+                return entropy_state.refine(potential_answers, similarity_lut.guess_ids[guess], similarity)
+            return potential_answers.refine(guess, similarity)
+        return CandidateSet.from_words(similarity_lut, refine_potential_answers(guess, potential_answers.words(),
+                                                                                similarity))
+    if guess in similarity_lut.guess_ids:
+        answer_ids = similarity_lut.answer_indices(potential_answers)
+        if answer_ids is not None:
+            matches = similarity_lut.matrix[similarity_lut.guess_ids[guess], answer_ids] == similarity
+            return [target for target, match in zip(potential_answers, matches) if match]
     refined_answers = []
     for target in potential_answers:
         if helper.compare(guess, target, lut=similarity_lut) == similarity:
@@ -128,6 +354,21 @@ def refine_potential_answers(guess: str, potential_answers: list, similarity: in
     return refined_answers
 
 
+def refine_candidates(guess_id: int, candidates: CandidateSet, similarity: int,
+                      entropy_state: EntropyState = None) -> CandidateSet:
+    """
+    Refine a candidate set from the result of a guess given by guess ID.
+    :param guess_id: guess ID of the guessed word
+    :param candidates: candidate set to refine from
+    :param similarity: similarity between guess and true answer
+    :param entropy_state: entropy state kept by the caller across turns, whose restricted pattern rows are reused
+    :return: refined candidate set
+    """
+    if entropy_state is not None:
+        return entropy_state.refine(candidates, guess_id, similarity)
+    return candidates.refine_id(guess_id, similarity)
+
+
 def accept_test_result():
     """
     Let the user input the word guessed and the result as a pattern.
@@ -146,101 +387,125 @@ def accept_test_result():
     return splits[0], splits[1]
 
 
-def man_solver():
+def man_solver(hard_mode: bool = False):
     """
     Manual solver of a Wordle puzzle.
+    :param hard_mode: only suggest and accept guesses consistent with every hint revealed so far
     """
-    legal_guesses = helper.get_guess_dictionary()
-    potential_answers = helper.get_answer_dictionary()
+    legal_guesses = engine.get_engine().similarity_lut.legal_guesses
+    potential_answers = CandidateSet.full(engine.get_engine().similarity_lut)
+    guess_index = EntropyState(engine.get_engine().similarity_lut)
+    hard_mode_filter = HardModeFilter(engine.get_engine().hard_mode_index) if hard_mode else None
+    print(engine.get_engine())
     for attempt in range(max_attempts):
         if attempt == 0:
-            entropies = initial_entropies
-            probabilities = initial_probabilities
+            entropies = engine.get_engine().initial_entropies
+            probabilities = engine.get_engine().initial_probabilities
         else:
-            entropies = compute_entropy(legal_guesses, potential_answers)
+            entropies = compute_entropy(legal_guesses, potential_answers, guess_index=guess_index)
             probabilities = compute_probabilities(legal_guesses, potential_answers)
+        if hard_mode_filter is not None:
+            entropies = np.where(hard_mode_filter.allowed, entropies, -np.inf)
+            print(hard_mode_filter)
         scores = compute_score_1(entropies, probabilities)
         print_results(legal_guesses, entropies, probabilities, scores)
         guess, pattern = accept_test_result()
+        while hard_mode_filter is not None and guess not in hard_mode_filter:
+            print('Not allowed in hard mode! Please try again.')
+            guess, pattern = accept_test_result()
         similarity = helper.pattern_to_similarity(pattern)
-        if similarity == 3 ** 5 - 1:
+        if similarity == 3 ** len(pattern) - 1:
             print('Congratulations!')
             break
-        potential_answers = refine_potential_answers(guess, potential_answers, similarity)
+        potential_answers = refine_potential_answers(guess, potential_answers, similarity, guess_index)
+        if hard_mode_filter is not None:
+            hard_mode_filter.update(guess, similarity)
 
 
-def auto_solver(strategy: str = 'score 1'):
+def next_guess(strategy: str, legal_guesses: list, potential_answers, first_attempt: bool = False,
+               guess_index: GuessIndex = None, allowed: np.ndarray = None) -> int:
     """
-    Generator object that solves a Wordle puzzle automatically according to a given strategy.
-    :param strategy: 'entropy first', 'score 1'
+    Choose the next guess according to a given strategy.
+    :param strategy: 'entropy first', 'score 1', 'score 2', 'lookahead 2'
+    :param legal_guesses: list of legal guesses
+    :param potential_answers: candidate set or list of potential answers remaining
+    :param first_attempt: use the cached initial entropies and probabilities
+    :param guess_index: reduction index of the guesses kept across turns, see compute_entropy
+    :param allowed: boolean mask of the legal guesses allowed in hard mode. Default every guess.
+    :return: guess ID of the guess, i.e. its index in legal_guesses
     """
-    legal_guesses = helper.get_guess_dictionary()
-    potential_answers = helper.get_answer_dictionary()
+    if first_attempt:
+        # initial entropies
+        entropies = engine.get_engine().initial_entropies
+        probabilities = engine.get_engine().initial_probabilities
+    else:
+        entropies = compute_entropy(legal_guesses, potential_answers, do_print=False, guess_index=guess_index)
+        if strategy not in ('entropy first', 'lookahead 2'):
+            probabilities = compute_probabilities(legal_guesses, potential_answers)
+    if allowed is not None:
+        entropies = np.where(allowed, entropies, -np.inf)
+    if strategy == 'entropy first':
+        if len(potential_answers) == 1:
+            guess_id = engine.get_engine().similarity_lut.answer_guess_ids[answer_indices(potential_answers)[0]]
+        else:
+            guess_id = ranking.top_k(entropies, 1)[0]
+    elif strategy == 'score 1':
+        scores = compute_score_1(entropies, probabilities)
+        guess_id = ranking.top_k(scores, 1)[0]
+    elif strategy == 'score 2':
+        scores = compute_score_2(entropies, probabilities)
+        guess_id = ranking.top_k(scores, 1)[0]
+    elif strategy == 'lookahead 2':
+        guess_id = lookahead_guess(legal_guesses, potential_answers, entropies, hard_mode=allowed is not None)
+    else:
+        raise NotImplementedError
+    return int(guess_id)
+
+
+def auto_solver(strategy: str = 'score 1', cache: memo.DecisionCache = decision_cache, hard_mode: bool = False):
+    """
+    Generator object that solves a Wordle puzzle automatically according to a given strategy. Guesses are handled by
+    guess ID, and only yielded as words.
+    :param strategy: 'entropy first', 'score 1', 'score 2', 'lookahead 2'
+    :param cache: cache of decisions keyed by the remaining candidates, shared by every game. None to disable.
+    :param hard_mode: only guess words consistent with every hint revealed so far
+    """
+    legal_guesses = engine.get_engine().similarity_lut.legal_guesses
+    potential_answers = CandidateSet.full(engine.get_engine().similarity_lut)
+    guess_index = EntropyState(engine.get_engine().similarity_lut)
+    hard_mode_filter = HardModeFilter(engine.get_engine().hard_mode_index) if hard_mode else None
+    allowed = None
     first_attempt = True
     while True:
-        if first_attempt:
-            # initial entropies
-            entropies = initial_entropies
-            probabilities = initial_probabilities
-            first_attempt = False
-        else:
-            entropies = compute_entropy(legal_guesses, potential_answers, do_print=False)
-            if not strategy == 'entropy first':
-                probabilities = compute_probabilities(legal_guesses, potential_answers)
-        if strategy == 'entropy first':
-            if len(potential_answers) == 1:
-                guess = potential_answers[0]
-            else:
-                guesses = [(legal_guesses[i], entropies[i]) for i in range(len(legal_guesses))]
-                guess = sorted(guesses, key=lambda e: e[1], reverse=True)[0][0]
-        elif strategy == 'score 1':
-            scores = compute_score_1(entropies, probabilities)
-            guesses = [(legal_guesses[i], scores[i]) for i in range(len(legal_guesses))]
-            guess = sorted(guesses, key=lambda e: e[1], reverse=True)[0][0]
-        elif strategy == 'score 2':
-            scores = compute_score_2(entropies, probabilities)
-            guesses = [(legal_guesses[i], scores[i]) for i in range(len(legal_guesses))]
-            guess = sorted(guesses, key=lambda e: e[1], reverse=True)[0][0]
-        else:
-            raise NotImplementedError
-        yield guess
+        key = None
+        guess_id = None
+        if cache is not None:
+            key = cache.fingerprint(potential_answers.ids, strategy, allowed)
+            guess_id = cache.get(key)
+        if guess_id is None:
+            guess_id = next_guess(strategy, legal_guesses, potential_answers, first_attempt, guess_index, allowed)
+            if key is not None:
+                cache.put(key, guess_id)
+        first_attempt = False
+        yield legal_guesses[guess_id]
         similarity = yield
-        potential_answers = refine_potential_answers(guess, potential_answers, similarity)
-
-
-# initialise similarity LUT
-if os.path.exists('similarity_lut.pkl'):
-    with open('similarity_lut.pkl', 'rb') as pkl_file:
-        similarity_lut = pickle.load(pkl_file)
-else:
-    print('Initialising similarity LUT...')
-    similarity_lut = helper.gen_similarity_LUT()
-    with open('similarity_lut.pkl', 'wb') as pkl_file:
-        pickle.dump(similarity_lut, pkl_file)
-# initial entropies
-if os.path.exists('initial_entropies.npy'):
-    print('loading initial_entropies.npy...')
-    with open('initial_entropies.npy', 'rb') as npy_file:
-        initial_entropies = np.load(npy_file)
-else:
-    initial_entropies = compute_entropy()
-    print('saving initial_entropies.npy...')
-    with open('initial_entropies.npy', 'wb') as npy_file:
-        np.save(npy_file, initial_entropies)
-# initial probabilities
-if os.path.exists('initial_probabilities.npy'):
-    print('loading initial_probabilities.npy...')
-    with open('initial_probabilities.npy', 'rb') as npy_file:
-        initial_probabilities = np.load(npy_file)
-else:
-    initial_probabilities = compute_probabilities()
-    print('saving initial_probabilities.npy...')
-    with open('initial_probabilities.npy', 'wb') as npy_file:
-        np.save(npy_file, initial_probabilities)
+        potential_answers = refine_candidates(guess_id, potential_answers, similarity, guess_index)
+        if hard_mode_filter is not None:
+            hard_mode_filter.update_id(guess_id, similarity)
+            allowed = hard_mode_filter.allowed
+
+
+def __getattr__(name: str):
+    # the heavy state lives in the lazily built engine, so that importing this module stays free of side effects
+    if name in ('similarity_lut', 'initial_entropies', 'initial_probabilities'):
+        return getattr(engine.get_engine(), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 if __name__ == "__main__":
-    man_solver()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hard', action='store_true', help="hard mode: every guess must be consistent with all hints")
+    man_solver(parser.parse_args().hard)
 
 
 # EOF
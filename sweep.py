@@ -0,0 +1,163 @@
+"""
+Sweep of the parameters of the score S = (H + a * p) / (b ^ 2 - p ^ 2) over every potential answer.
+The automatic solver is deterministic, so every setting plays a decision tree. The trees of all settings are walked
+together: the entropies and probabilities of a candidate set are computed once for every setting reaching it, and the
+settings only split where they choose different guesses. The subtrees below the first guesses are walked in parallel.
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import engine
+import ranking
+import solver
+from candidates import CandidateSet
+
+__author__ = "Z Feng"
+
+max_guesses = 6  # games needing more guesses count as failures
+max_depth = 10  # games still unsolved after this many guesses are abandoned
+
+
+def walk(answers: CandidateSet, settings: list, params: list, depth: int, attempts: np.ndarray,
+         times: np.ndarray) -> int:
+    """
+    Walk the decision trees of several settings from a common candidate set.
+    :param answers: candidate set reached by every setting in settings
+    :param settings: indices of the settings
+    :param params: (a, b) of every setting
+    :param depth: number of guesses already played
+    :param attempts: attempts[setting, d] counts the answers solved in d + 1 guesses, updated in place
+    :param times: seconds spent choosing guesses by every setting, shared computations split evenly, updated in place
+    :return: number of nodes visited
+    """
+    t_start = time.perf_counter()
+    lut = engine.get_engine().similarity_lut
+    if depth == 0:
+        entropies = engine.get_engine().initial_entropies
+        probabilities = engine.get_engine().initial_probabilities
+    else:
+        if len(answers) == 1:
+            # no guess splits the last candidate, so every entropy is 0 and only the probabilities rank the guesses.
+            # With a <= 0 the last candidate is not preferred, and the game fails once max_depth is reached.
+            entropies = np.zeros(len(lut.legal_guesses))
+        else:
+            entropies = solver.compute_entropy(lut.legal_guesses, answers, do_print=False)
+        probabilities = solver.compute_probabilities(lut.legal_guesses, answers)
+    groups = {}
+    for setting in settings:
+        scores = solver.compute_score(entropies, probabilities, *params[setting])
+        groups.setdefault(int(ranking.top_k(scores, 1)[0]), []).append(setting)
+    times[settings] += (time.perf_counter() - t_start) / len(settings)
+    nodes = 1
+    for guess_id, group in groups.items():
+        similarities = lut.matrix[guess_id, answers.ids]
+        for similarity in np.unique(similarities):
+            if similarity == lut.solved_similarity:
+                attempts[group, depth] += 1
+            elif depth + 1 < max_depth:
+                nodes += walk(answers.refine_id(guess_id, similarity), group, params, depth + 1, attempts, times)
+    return nodes
+
+
+def walk_subtree(task: tuple, params: list) -> tuple:
+    """
+    Walk the subtree below a first guess and one of its patterns in a worker process.
+    :param task: settings playing the first guess, guess ID of the first guess, similarity received
+    :param params: (a, b) of every setting
+    :return: attempts, times and nodes of the subtree
+    """
+    settings, guess_id, similarity = task
+    lut = engine.get_engine().similarity_lut
+    attempts = np.zeros((len(params), max_depth), dtype=np.int64)
+    times = np.zeros(len(params))
+    nodes = walk(CandidateSet.full(lut).refine_id(guess_id, similarity), settings, params, 1, attempts, times)
+    return attempts, times, nodes
+
+
+def sweep(params: list, workers: int = None) -> list:
+    """
+    Play every setting over every potential answer.
+    :param params: (a, b) of every setting. b must be more than 1, so that the score has no pole for p <= 1.
+    :param workers: number of worker processes. Default the number of CPUs.
+    :return: result of every setting with a, b, mean guesses, failure rate and seconds spent choosing guesses
+    """
+    for a, b in params:
+        if b <= 1:
+            raise ValueError(f'b = {b} must be more than 1')
+    t_start = time.perf_counter()
+    shared_engine = engine.get_engine()
+    lut = shared_engine.similarity_lut
+    attempts = np.zeros((len(params), max_depth), dtype=np.int64)
+    times = np.zeros(len(params))
+    first_guesses = {}
+    for setting, (a, b) in enumerate(params):
+        scores = solver.compute_score(shared_engine.initial_entropies, shared_engine.initial_probabilities, a, b)
+        first_guesses.setdefault(int(ranking.top_k(scores, 1)[0]), []).append(setting)
+    times += (time.perf_counter() - t_start) / len(params)
+    tasks = []
+    for guess_id, settings in first_guesses.items():
+        similarities, counts = np.unique(lut.matrix[guess_id], return_counts=True)
+        for similarity, count in zip(similarities, counts):
+            if similarity == lut.solved_similarity:
+                attempts[settings, 0] += 1
+            else:
+                tasks.append((count, (settings, guess_id, int(similarity))))
+    tasks = [task for count, task in sorted(tasks, key=lambda e: e[0], reverse=True)]
+    print(f'{len(params)} settings, {len(first_guesses)} first guesses, {len(tasks)} subtrees '
+          f'with {workers or os.cpu_count()} workers')
+    nodes = len(first_guesses)
+    with multiprocessing.Pool(workers) as pool:
+        for i, (task_attempts, task_times, task_nodes) in enumerate(
+                pool.imap_unordered(functools.partial(walk_subtree, params=params), tasks)):
+            attempts += task_attempts
+            times += task_times
+            nodes += task_nodes
+            if (i + 1) % 100 == 0:
+                print(f'{i + 1}/{len(tasks)} subtrees, {nodes} nodes')
+    wall_time = time.perf_counter() - t_start
+    print(f'{nodes} nodes in {wall_time:.1f} seconds')
+    results = []
+    n_answers = len(lut.potential_answers)
+    for (a, b), setting_attempts, setting_time in zip(params, attempts, times):
+        solved = setting_attempts.sum()
+        results.append({'a': a, 'b': b,
+                        'mean': float(np.sum(setting_attempts * np.arange(1, max_depth + 1)) / solved),
+                        'failure_rate': float((n_answers - setting_attempts[:max_guesses].sum()) / n_answers),
+                        'time': float(setting_time), 'attempts': setting_attempts.tolist(), 'wall_time': wall_time})
+    return results
+
+
+def print_results(results: list) -> None:
+    """
+    Print the results of a sweep, best mean first.
+    :param results: results of sweep
+    :return: None
+    """
+    print(f'\n{"a":>8}{"b":>8}{"mean":>10}{"failed":>10}{"time (s)":>10}')
+    for result in sorted(results, key=lambda e: e['mean']):
+        print(f'{result["a"]:>8.3g}{result["b"]:>8.3g}{result["mean"]:>10.4f}{100 * result["failure_rate"]:>9.2f}%'
+              f'{result["time"]:>10.1f}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--a', default='0,0.1,1', help="comma separated weights a of the probability")
+    parser.add_argument('--b', default='1.1', help="comma separated poles b of the score, more than 1")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args()
+    grid = list(itertools.product([float(a) for a in args.a.split(',')], [float(b) for b in args.b.split(',')]))
+    sweep_results = sweep(grid, args.workers)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(sweep_results, f, indent=2)
+    print_results(sweep_results)
+
+# EOF
@@ -0,0 +1,149 @@
+"""
+Builder of the pattern table for any word lists and word length.
+The table is computed in shards of rows spread over a process pool, and written straight into a memory-mapped .npy
+file of the smallest integer type holding 3^N patterns. Every finished shard is recorded in a progress file next to the
+partial table, so an interrupted build resumes from the shards still missing. The table is moved to its final path only
+once complete, and is then found by the cache manager of the same word lists, so that the solvers and the simulator run
+on it by pointing WORDLE_GUESS_FILE and WORDLE_ANSWER_FILE to the word lists.
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+import numpy as np
+
+import cache_manager
+import dictionary
+import engine
+import helper
+
+__author__ = "Z Feng"
+
+shard_rows = 1024  # guesses of every shard
+compare_chunk_size = 256  # guesses compared at once within a shard to bound peak memory
+_guesses = None  # letter matrices of the guesses and answers in a worker process
+_targets = None
+
+
+def init_worker(guesses: np.ndarray, targets: np.ndarray) -> None:
+    """
+    Initialise a worker process of the builder with the encoded word lists, sent once instead of with every shard.
+    """
+    global _guesses, _targets
+    _guesses, _targets = guesses, targets
+
+
+def build_shard(task: tuple) -> int:
+    """
+    Compute the rows of a shard and write them to the partial table.
+    :param task: path of the partial table, index of the shard, first and last row of the shard
+    :return: index of the shard, once its rows are flushed to the file
+    """
+    path, shard, start, stop = task
+    table = np.load(path, mmap_mode='r+')
+    for chunk_start in range(start, stop, compare_chunk_size):
+        chunk_stop = min(chunk_start + compare_chunk_size, stop)
+        table[chunk_start:chunk_stop] = helper.compare_batch(_guesses[chunk_start:chunk_stop], _targets)
+    table.flush()
+    del table
+    return shard
+
+
+def read_progress(progress_path: str, header: str) -> set:
+    """
+    :param progress_path: path of the progress file
+    :param header: first line describing the table, which must match for the recorded shards to be reused
+    :return: indices of the shards finished, empty if the file is missing or describes another table
+    """
+    if not os.path.exists(progress_path):
+        return set()
+    with open(progress_path, 'r') as f:
+        lines = f.read().split('\n')
+    if lines[0] != header:
+        return set()
+    # a partially written last line is ignored, as its shard is not known to be finished
+    return {int(line) for line in lines[1:-1] if line}
+
+
+def build_pattern_table(legal_guesses: list, potential_answers: list, path: str, workers: int = None,
+                        rows: int = None) -> np.ndarray:
+    """
+    Build the pattern table of two word lists, table[i, j] == compare(legal_guesses[i], potential_answers[j]).
+    :param legal_guesses: list of legal guesses
+    :param potential_answers: list of potential answers, of the same length as the guesses
+    :param path: path of the .npy file of the table
+    :param workers: number of worker processes. Default the number of CPUs. With 1, shards are built in this process.
+    :param rows: guesses of every shard. Default shard_rows.
+    :return: table as a read-only memory map
+    """
+    if rows is None:
+        rows = shard_rows
+    word_dictionary = dictionary.get_dictionary(legal_guesses, potential_answers)
+    guesses, targets = word_dictionary.guess_letters, word_dictionary.answer_letters
+    if guesses.shape[1] != targets.shape[1]:
+        raise ValueError(f'Guesses of {guesses.shape[1]} letters and answers of {targets.shape[1]} letters')
+    shape = (len(legal_guesses), len(potential_answers))
+    dtype = helper.pattern_dtype(guesses.shape[1])
+    partial_path = path + '.partial'
+    progress_path = path + '.progress'
+    header = f'{shape[0]} {shape[1]} {dtype.name} {rows}'
+    done = read_progress(progress_path, header) if os.path.exists(partial_path) else set()
+    if not done:
+        np.lib.format.open_memmap(partial_path, mode='w+', dtype=dtype, shape=shape).flush()
+        with open(progress_path, 'w') as f:
+            f.write(header + '\n')
+    n_shards = -(-shape[0] // rows)
+    tasks = [(partial_path, shard, shard * rows, min((shard + 1) * rows, shape[0]))
+             for shard in range(n_shards) if shard not in done]
+    print(f'Building a {shape[0]} x {shape[1]} {dtype.name} pattern table: {len(done)}/{n_shards} shards done')
+    t_start = time.perf_counter()
+
+    def record(results) -> None:
+        with open(progress_path, 'a') as progress:
+            for i, shard in enumerate(results):
+                progress.write(f'{shard}\n')
+                progress.flush()
+                os.fsync(progress.fileno())
+                if (i + 1) % max(1, len(tasks) // 10) == 0 or i + 1 == len(tasks):
+                    print(f'{len(done) + i + 1}/{n_shards} shards in {time.perf_counter() - t_start:.1f} seconds')
+
+    if workers == 1:
+        init_worker(guesses, targets)
+        record(map(build_shard, tasks))
+    else:
+        with multiprocessing.Pool(workers, init_worker, (guesses, targets)) as pool:
+            record(pool.imap_unordered(build_shard, tasks))
+    os.replace(partial_path, path)
+    os.remove(progress_path)
+    return np.load(path, mmap_mode='r')
+
+
+def default_workers() -> int:
+    """
+    :return: number of CPUs, or 1 in a daemon process such as a worker of a pool, which cannot start its own pool
+    """
+    return 1 if multiprocessing.current_process().daemon else os.cpu_count()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--guesses', default=dictionary.guess_file, help="file of legal guesses, one per line")
+    parser.add_argument('--answers', default=dictionary.answer_file, help="file of potential answers, one per line")
+    parser.add_argument('--length', type=int, help="number of letters of every word, checked against the files")
+    parser.add_argument('--workers', type=int, help="number of worker processes. Default the number of CPUs")
+    parser.add_argument('--shard-rows', type=int, default=shard_rows, help="guesses of every shard")
+    parser.add_argument('--cache-dir', help="root directory of the artifact cache. Default see cache_manager")
+    args = parser.parse_args()
+    guess_list = dictionary.read_words(args.guesses)
+    answer_list = dictionary.read_words(args.answers)
+    for words, file in ((guess_list, args.guesses), (answer_list, args.answers)):
+        if args.length is not None and words and len(words[0]) != args.length:
+            parser.error(f'{file} has words of {len(words[0])} letters, not {args.length}')
+    cache = cache_manager.CacheManager(args.cache_dir, guess_list, answer_list)
+    cache.load_pattern_lut(args.workers, args.shard_rows)
+    # also build the initial entropies and probabilities, so that the solvers start at once
+    print(engine.Engine(args.cache_dir, guess_list, answer_list))
+    print(f'Cached in {cache.directory}')
+
+# EOF